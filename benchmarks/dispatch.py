@@ -0,0 +1,75 @@
+"""Measure the client-side overhead of `Client.request` as the number of
+loaded services and of pass-through interceptors grows.
+
+The multi-callable of the benchmarked method is replaced by a no-op so
+that only the dispatch and serializer construction is timed, and no
+server is required.
+
+Usage: python -m benchmarks.dispatch
+"""
+from __future__ import print_function
+
+import timeit
+
+from grpc.beta import implementations
+from grpc.framework.common.cardinality import Cardinality
+from pygrpc import Client, Interceptor
+from tests.route_guide import route_guide_pb2
+
+NUMBER = 100000
+SERVICES = (1, 4, 16, 64)
+INTERCEPTORS = (0, 1, 4)
+
+
+def _noop(request, timeout):
+    return request
+
+
+def _stub(channel, group, name):
+    """Return a stub for the `group` service which defines a single
+    `GetFeature`-shaped method called `name`.
+    """
+    cardinalities = {name: Cardinality.UNARY_UNARY}
+    request_serializers = {
+        (group, name): route_guide_pb2.Point.SerializeToString,
+    }
+    response_deserializers = {
+        (group, name): route_guide_pb2.Feature.FromString,
+    }
+    options = implementations.stub_options(
+        request_serializers=request_serializers,
+        response_deserializers=response_deserializers
+    )
+    return implementations.dynamic_stub(channel, group, cardinalities,
+                                        options=options)
+
+
+def run(services, interceptors=0):
+    client = Client('localhost', 50051,
+                    interceptors=[Interceptor()] * interceptors)
+    client.stubs = [_stub(client._channel, 'bench.Service{}'.format(i),
+                          'GetFeature{}'.format(i))
+                    for i in xrange(services)]
+    # Benchmark the method of the last service, which a linear scan
+    # over the stubs would reach last.
+    name = 'GetFeature{}'.format(services - 1)
+    client._index.resolve(name).callable = _noop
+    seconds = timeit.timeit(
+        lambda: client.request(name, latitude=1, longitude=2),
+        number=NUMBER
+    )
+    return seconds / NUMBER * 1e6
+
+
+def main():
+    print('{:>8} {:>12} {:>12}'.format('services', 'interceptors',
+                                       'us/call'))
+    for services in SERVICES:
+        for interceptors in INTERCEPTORS:
+            print('{:>8} {:>12} {:>12.3f}'.format(
+                services, interceptors, run(services, interceptors)
+            ))
+
+
+if __name__ == '__main__':
+    main()
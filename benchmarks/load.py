@@ -0,0 +1,101 @@
+"""Measure the startup time and memory of `Client.load` for a module
+that defines many services, of which only one is used.
+
+`eager` forces every stub object to be generated, as `load` used to;
+`lazy` generates only the stub object of the service that is requested.
+Memory is reported as the number of objects tracked by the garbage
+collector that were allocated by the load.
+
+Usage: python -m benchmarks.load
+"""
+from __future__ import print_function
+
+import abc
+import gc
+import imp
+import sys
+import time
+
+from grpc.beta import implementations
+from grpc.framework.common.cardinality import Cardinality
+from pygrpc import Client
+from tests.route_guide import route_guide_pb2
+
+MODULE = 'benchmarks._services_pb2'
+SERVICES = (10, 100, 500)
+METHODS = ('GetFeature', 'ListFeatures', 'RecordRoute', 'RouteChat')
+CARDINALITIES = (Cardinality.UNARY_UNARY, Cardinality.UNARY_STREAM,
+                 Cardinality.STREAM_UNARY, Cardinality.STREAM_STREAM)
+
+
+def _factory(group, names):
+    cardinalities = dict(zip(names, CARDINALITIES))
+    request_serializers = dict(
+        ((group, name), route_guide_pb2.Point.SerializeToString)
+        for name in names
+    )
+    response_deserializers = dict(
+        ((group, name), route_guide_pb2.Feature.FromString)
+        for name in names
+    )
+
+    def create_stub(channel, host=None, metadata_transformer=None,
+                    pool=None, pool_size=None):
+        options = implementations.stub_options(
+            request_serializers=request_serializers,
+            response_deserializers=response_deserializers
+        )
+        return implementations.dynamic_stub(channel, group, cardinalities,
+                                            options=options)
+    return create_stub
+
+
+def _module(services):
+    """Return a module object shaped like a generated `*_pb2` module
+    which defines `services` services.
+    """
+    module = imp.new_module(MODULE)
+    for i in xrange(services):
+        name = 'Service{}'.format(i)
+        names = tuple('{}{}'.format(method, i) for method in METHODS)
+        interface = abc.ABCMeta('Beta{}Stub'.format(name), (object,), dict(
+            (method, abc.abstractmethod(lambda self, request, timeout: None))
+            for method in names
+        ))
+        setattr(module, interface.__name__, interface)
+        setattr(module, 'beta_create_{}_stub'.format(name),
+                _factory('bench.{}'.format(name), names))
+    sys.modules[MODULE] = module
+    return module
+
+
+def run(services, eager):
+    _module(services)
+    gc.collect()
+    objects = len(gc.get_objects())
+    start = time.time()
+    client = Client('localhost', 50051)
+    client.load(MODULE)
+    if eager:
+        client.stubs
+    client._resolve('GetFeature0')
+    seconds = time.time() - start
+    gc.collect()
+    objects = len(gc.get_objects()) - objects
+    del client
+    return seconds * 1e3, objects
+
+
+def main():
+    print('{:>8} {:>6} {:>10} {:>10}'.format('services', 'mode', 'ms',
+                                             'objects'))
+    for services in SERVICES:
+        for eager in (True, False):
+            ms, objects = run(services, eager)
+            print('{:>8} {:>6} {:>10.2f} {:>10}'.format(
+                services, 'eager' if eager else 'lazy', ms, objects
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Replay a log captured with `pygrpc.Capture` against a server, e.g. a
+local one, and report the latency distributions per RPC method next to
+the captured ones.
+
+Usage: python -m benchmarks.replay LOG --module MODULE [--host HOST]
+           [--port PORT] [--speed FACTOR | --max-speed]
+           [--concurrency N] [--output FILE]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+from pygrpc import Client, Replayer, read_log
+
+
+def _ms(seconds):
+    return float('nan') if seconds is None else seconds * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('log', help='the captured log file')
+    parser.add_argument('--module', action='append', required=True,
+                        help='a Google Protocol Buffer module to load, '
+                        'e.g. tests.route_guide.route_guide_pb2')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=50051)
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='the factor by which the captured pace is '
+                        'sped up')
+    parser.add_argument('--max-speed', action='store_true',
+                        help='replay as fast as possible')
+    parser.add_argument('--concurrency', type=int, default=64,
+                        help='the maximum number of RPC requests in flight')
+    parser.add_argument('--output', help='write the JSON report to FILE')
+    args = parser.parse_args(argv)
+    client = Client(args.host, args.port)
+    for module in args.module:
+        client.load(module)
+    calls = read_log(args.log)
+    report = Replayer(client, calls,
+                      speed=None if args.max_speed else args.speed,
+                      concurrency=args.concurrency).run()
+    for name, stats in sorted(report['methods'].iteritems()):
+        latency = stats['latency']
+        captured = stats['captured_latency']
+        print('{:>16} {:>6} calls {:>6} errors p50 {:>9.2f} ms '
+              'p99 {:>9.2f} ms (captured p50 {:>9.2f} ms p99 {:>9.2f} ms)'
+              .format(name, stats['calls'], sum(stats['errors'].values()),
+                      _ms(latency['p50']), _ms(latency['p99']),
+                      _ms(captured['p50']), _ms(captured['p99'])),
+              file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
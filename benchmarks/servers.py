@@ -0,0 +1,90 @@
+"""In-process Greeter and RouteGuide servers for the benchmarks, built
+from the generated `beta_create_*_server` factories and fed from
+`route_guide_db.json`.
+
+Unlike the servers that the tests expect on `localhost:50051`, they do
+not sleep between streamed messages.
+"""
+from tests.helloworld import helloworld_pb2
+from tests.route_guide import route_guide_pb2
+from tests.route_guide import route_guide_resources
+
+HOST = 'localhost'
+
+
+class Greeter(helloworld_pb2.BetaGreeterServicer):
+
+    def SayHello(self, request, context):
+        return helloworld_pb2.HelloReply(
+            message='Hello, {}!'.format(request.name)
+        )
+
+
+def _contains(rectangle, point):
+    lo, hi = rectangle.lo, rectangle.hi
+    return (min(lo.longitude, hi.longitude) <= point.longitude <=
+            max(lo.longitude, hi.longitude) and
+            min(lo.latitude, hi.latitude) <= point.latitude <=
+            max(lo.latitude, hi.latitude))
+
+
+class RouteGuide(route_guide_pb2.BetaRouteGuideServicer):
+
+    def __init__(self):
+        self.features = route_guide_resources.read_route_guide_database()
+        self._index = dict(
+            ((f.location.latitude, f.location.longitude), f)
+            for f in self.features
+        )
+
+    def GetFeature(self, request, context):
+        feature = self._index.get((request.latitude, request.longitude))
+        if feature is None:
+            return route_guide_pb2.Feature(name='', location=request)
+        return feature
+
+    def ListFeatures(self, request, context):
+        for feature in self.features:
+            if _contains(request, feature.location):
+                yield feature
+
+    def RecordRoute(self, request_iterator, context):
+        count = 0
+        for _ in request_iterator:
+            count += 1
+        return route_guide_pb2.RouteSummary(point_count=count)
+
+    def RouteChat(self, request_iterator, context):
+        for note in request_iterator:
+            yield note
+
+
+class Servers(object):
+    """Start a Greeter and a RouteGuide server on free local ports."""
+
+    def __init__(self):
+        self.route_guide = RouteGuide()
+        self._servers = []
+        self.greeter_port = self._start(
+            helloworld_pb2.beta_create_Greeter_server(Greeter())
+        )
+        self.route_guide_port = self._start(
+            route_guide_pb2.beta_create_RouteGuide_server(self.route_guide)
+        )
+
+    def _start(self, server):
+        port = server.add_insecure_port('[::]:0')
+        server.start()
+        self._servers.append(server)
+        return port
+
+    def stop(self):
+        for server in self._servers:
+            server.stop(0)
+        self._servers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,267 @@
+"""Measure the four RPC cardinalities through `Client.request` and
+through the raw generated stubs, against in-process Greeter and
+RouteGuide servers.
+
+For each RPC method and path it reports the operations per second, the
+p50 and p99 latencies, and the number of objects tracked by the garbage
+collector that each call leaves allocated; for the unary methods it
+also reports the operations per second as the number of threads grows.
+The results are written as JSON, and can be compared with the results
+of an earlier run to detect regressions.
+
+Usage: python -m benchmarks.suite [--duration SECONDS]
+           [--threads 1,2,4,8] [--stream-size N] [--output FILE]
+           [--baseline FILE] [--tolerance 0.1]
+"""
+from __future__ import print_function
+
+import argparse
+import collections
+import gc
+import json
+import platform
+import sys
+import threading
+import time
+import timeit
+
+from benchmarks.servers import HOST, Servers
+from grpc.beta import implementations
+from pygrpc import Client
+from tests.helloworld import helloworld_pb2
+from tests.route_guide import route_guide_pb2
+
+TIMEOUT = 10
+PATHS = ('client', 'stub')
+# The unary RPC methods whose throughput is measured per thread count.
+SCALING = ('SayHello', 'GetFeature')
+
+
+def _grpc_version():
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution('grpcio').version
+    except Exception:
+        return None
+
+
+def workloads(servers, stream_size):
+    """Return an ordered dictionary mapping each RPC method name to a
+    dictionary mapping each path to a callable that issues one RPC
+    request and consumes its response.
+    """
+    greeter = Client(HOST, servers.greeter_port)
+    greeter.load('tests.helloworld.helloworld_pb2')
+    greeter_stub = helloworld_pb2.beta_create_Greeter_stub(
+        implementations.insecure_channel(HOST, servers.greeter_port)
+    )
+    client = Client(HOST, servers.route_guide_port)
+    client.load('tests.route_guide.route_guide_pb2')
+    stub = route_guide_pb2.beta_create_RouteGuide_stub(
+        implementations.insecure_channel(HOST, servers.route_guide_port)
+    )
+    features = servers.route_guide.features
+    location = features[0].location
+    latitudes = [f.location.latitude for f in features]
+    longitudes = [f.location.longitude for f in features]
+    # A rectangle that contains every feature of the database.
+    rectangle = route_guide_pb2.Rectangle(
+        lo=route_guide_pb2.Point(latitude=min(latitudes),
+                                 longitude=min(longitudes)),
+        hi=route_guide_pb2.Point(latitude=max(latitudes),
+                                 longitude=max(longitudes))
+    )
+    points = [features[i % len(features)].location
+              for i in xrange(stream_size)]
+    notes = [route_guide_pb2.RouteNote(message='note', location=point)
+             for point in points]
+    return collections.OrderedDict([
+        ('SayHello', {
+            'client': lambda: greeter.request('SayHello', name='you'),
+            'stub': lambda: greeter_stub.SayHello(
+                helloworld_pb2.HelloRequest(name='you'), TIMEOUT
+            ),
+        }),
+        ('GetFeature', {
+            'client': lambda: client.request(
+                'GetFeature', latitude=location.latitude,
+                longitude=location.longitude
+            ),
+            'stub': lambda: stub.GetFeature(
+                route_guide_pb2.Point(latitude=location.latitude,
+                                      longitude=location.longitude),
+                TIMEOUT
+            ),
+        }),
+        ('ListFeatures', {
+            'client': lambda: list(client.request('ListFeatures',
+                                                  rectangle)),
+            'stub': lambda: list(stub.ListFeatures(rectangle, TIMEOUT)),
+        }),
+        ('RecordRoute', {
+            'client': lambda: client.request('RecordRoute', iter(points)),
+            'stub': lambda: stub.RecordRoute(iter(points), TIMEOUT),
+        }),
+        ('RouteChat', {
+            'client': lambda: list(client.request('RouteChat', iter(notes))),
+            'stub': lambda: list(stub.RouteChat(iter(notes), TIMEOUT)),
+        }),
+    ])
+
+
+def _percentile(latencies, q):
+    return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+
+
+def measure(fn, duration, threads=1):
+    """Call `fn` on `threads` threads for `duration` seconds and return
+    the throughput and latency percentiles.
+    """
+    fn()
+    latencies = [[] for _ in xrange(threads)]
+    expires = timeit.default_timer() + duration
+
+    def run(latencies):
+        clock = timeit.default_timer
+        append = latencies.append
+        while True:
+            started = clock()
+            if started >= expires:
+                return
+            fn()
+            append(clock() - started)
+
+    workers = [threading.Thread(target=run, args=(latencies[i],))
+               for i in xrange(threads)]
+    started = timeit.default_timer()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = timeit.default_timer() - started
+    latencies = sorted(sum(latencies, []))
+    if not latencies:
+        return {'calls': 0, 'ops_per_sec': 0.0, 'p50_us': None,
+                'p99_us': None}
+    return collections.OrderedDict([
+        ('calls', len(latencies)),
+        ('ops_per_sec', len(latencies) / elapsed),
+        ('p50_us', _percentile(latencies, 0.5) * 1e6),
+        ('p99_us', _percentile(latencies, 0.99) * 1e6),
+    ])
+
+
+def allocations(fn, calls=200):
+    """Return the number of objects tracked by the garbage collector
+    that each call of `fn` leaves allocated.
+
+    The total number of allocations is not observable on CPython 2
+    without an instrumented build, therefore, the objects that are still
+    alive after the calls are counted, with the collector disabled.
+    """
+    fn()
+    gc.collect()
+    gc.disable()
+    try:
+        before = len(gc.get_objects())
+        for _ in xrange(calls):
+            fn()
+        after = len(gc.get_objects())
+    finally:
+        gc.enable()
+    return float(after - before) / calls
+
+
+def run(duration=1.0, threads=(1, 2, 4, 8), stream_size=100):
+    """Run the benchmarks and return the results as a dictionary."""
+    results = collections.OrderedDict()
+    scaling = collections.OrderedDict()
+    with Servers() as servers:
+        for name, paths in workloads(servers, stream_size).iteritems():
+            results[name] = collections.OrderedDict()
+            for path in PATHS:
+                result = measure(paths[path], duration)
+                result['objects_per_call'] = allocations(paths[path])
+                results[name][path] = result
+                print('{:>12} {:>6} {:>12.1f} ops/s p50 {:>10.1f} us '
+                      'p99 {:>10.1f} us'.format(name, path,
+                                                result['ops_per_sec'],
+                                                result['p50_us'] or 0,
+                                                result['p99_us'] or 0),
+                      file=sys.stderr)
+            if name not in SCALING:
+                continue
+            scaling[name] = collections.OrderedDict()
+            for path in PATHS:
+                scaling[name][path] = collections.OrderedDict(
+                    (str(count),
+                     measure(paths[path], duration, count)['ops_per_sec'])
+                    for count in threads
+                )
+    return collections.OrderedDict([
+        ('python', platform.python_version()),
+        ('implementation', platform.python_implementation()),
+        ('grpcio', _grpc_version()),
+        ('time', time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())),
+        ('duration', duration),
+        ('stream_size', stream_size),
+        ('results', results),
+        ('scaling', scaling),
+    ])
+
+
+def compare(results, baseline, tolerance):
+    """Print the throughput of `results` relative to `baseline` and
+    return the `(method, path)` tuples that regressed by more than
+    `tolerance`.
+    """
+    regressions = []
+    for name, paths in results['results'].iteritems():
+        for path, result in paths.iteritems():
+            try:
+                before = baseline['results'][name][path]['ops_per_sec']
+            except KeyError:
+                continue
+            if not before:
+                continue
+            ratio = result['ops_per_sec'] / before
+            regressed = ratio < 1 - tolerance
+            if regressed:
+                regressions.append((name, path))
+            print('{:>12} {:>6} {:>8.3f}x{}'.format(
+                name, path, ratio, ' REGRESSION' if regressed else ''
+            ), file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--duration', type=float, default=1.0,
+                        help='seconds per measurement')
+    parser.add_argument('--threads', default='1,2,4,8',
+                        help='comma-separated thread counts')
+    parser.add_argument('--stream-size', type=int, default=100,
+                        help='messages per request stream')
+    parser.add_argument('--output', help='write the JSON results to FILE')
+    parser.add_argument('--baseline', help='compare with the JSON results '
+                        'of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='the throughput loss reported as a regression')
+    args = parser.parse_args(argv)
+    threads = tuple(int(count) for count in args.threads.split(','))
+    results = run(args.duration, threads, args.stream_size)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,20 @@
 from pygrpc import Client
+from breaker import CircuitBreaker, CircuitOpenError
+from cache import ResponseCache
+from coalesce import Coalescer
+from capture import Capture, Replayer, read_log
+from columnar import columns
+from compression import Compression
+from deadlines import deadline
+from hedge import Hedger
+from interceptors import CallDetails, Interceptor
+from limiter import (AIMDLimit, ConcurrencyLimiter, GradientLimit,
+                     LimitExceededError)
+from metrics import Metrics, Recorder
+from retry import Retrier, RetryBudget, RetryPolicy
+from streams import RequestQueue, batches
+from pool import (HealthCheck, LeastOutstanding, PooledClient,
+                  PowerOfTwoChoices, RoundRobin, read_addresses, rpc_probe)
 
 __author__ = 'Jason Walsh'
 __version__ = '0.1.0'
@@ -0,0 +1,55 @@
+"""Adapt gRPC future objects to `asyncio` future objects."""
+try:
+    import asyncio
+except ImportError:
+    try:
+        # Python 2 backport of `asyncio`.
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+
+def wrap_future(future, loop=None):
+    """Return an `asyncio.Future` object that completes with the result
+    of the gRPC `future` object.
+
+    The gRPC future completes on one of its own threads, therefore, the
+    outcome is handed to the event loop with `call_soon_threadsafe` and
+    no event loop thread is blocked while the RPC is in flight.
+    Cancelling the returned future object cancels the RPC.
+
+    :type future: grpc.framework.foundation.future.Future
+    :param future: The future object returned by a `future` call.
+
+    :type loop: asyncio.AbstractEventLoop
+    :param loop: The event loop of the returned future object. Defaults
+        to the current event loop.
+    """
+    if asyncio is None:
+        raise ImportError('asyncio (or trollius) is required to await '
+                          'RPC requests!')
+    if loop is None:
+        loop = asyncio.get_event_loop()
+    aio_future = asyncio.Future(loop=loop)
+
+    def _copy(future):
+        if aio_future.cancelled():
+            return
+        if future.cancelled():
+            aio_future.cancel()
+            return
+        exception = future.exception()
+        if exception is not None:
+            aio_future.set_exception(exception)
+        else:
+            aio_future.set_result(future.result())
+
+    def _cancel(aio_future):
+        if aio_future.cancelled():
+            future.cancel()
+
+    aio_future.add_done_callback(_cancel)
+    future.add_done_callback(
+        lambda future: loop.call_soon_threadsafe(_copy, future)
+    )
+    return aio_future
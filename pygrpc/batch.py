@@ -0,0 +1,107 @@
+import collections
+
+from grpc.framework.foundation import future as future_module
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class Result(collections.namedtuple('Result', ('index', 'request', 'response',
+                                               'exception'))):
+    """The outcome of a single RPC request issued by `request_many`.
+
+    Exactly one of `response` and `exception` is set.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.exception is None
+
+
+def request_many(client, method, requests, concurrency, ordered, timeout):
+    """Issue the `method` call once for each item of `requests` with at
+    most `concurrency` calls in flight, and yield a `Result` object per
+    item.
+
+    Results are yielded in input order if `ordered` is `True`, otherwise
+    in completion order. Results that completed ahead of an earlier item
+    count against `concurrency`, so memory stays bounded either way.
+    """
+    completed = queue.Queue()
+    # The futures of the RPC requests in flight keyed by item index.
+    pending = {}
+    # Results that completed ahead of the next index to yield.
+    buffered = {}
+    # The number of items submitted whose result has not been taken
+    # from the `completed` queue yet.
+    outstanding = 0
+    next_index = 0
+    requests = enumerate(requests)
+    exhausted = False
+
+    def _done(index, item, future):
+        if future.cancelled():
+            # The RPC request was cancelled, e.g. by an interceptor;
+            # report it so that the generator does not wait for it.
+            completed.put(Result(index, item, None,
+                                 future_module.CancelledError()))
+            return
+        exception = future.exception()
+        if exception is None:
+            completed.put(Result(index, item, future.result(), None))
+        else:
+            completed.put(Result(index, item, None, exception))
+
+    def _submit(index, item):
+        if method.unary_request and isinstance(item, dict):
+            args, kwargs = (), dict(item)
+        else:
+            args, kwargs = (item,), {}
+        kwargs.setdefault('timeout', timeout)
+        try:
+            variant, request, call_timeout = client._prepare(method, args,
+                                                             kwargs)
+            future = client._submit(variant, request, call_timeout,
+                                    future=True)
+        except Exception as exception:
+            completed.put(Result(index, item, None, exception))
+            return
+        pending[index] = future
+        future.add_done_callback(lambda future: _done(index, item, future))
+
+    try:
+        while True:
+            while (not exhausted and
+                   outstanding + len(buffered) < concurrency):
+                try:
+                    index, item = next(requests)
+                except StopIteration:
+                    exhausted = True
+                    break
+                outstanding += 1
+                _submit(index, item)
+            if ordered and next_index in buffered:
+                yield buffered.pop(next_index)
+                next_index += 1
+                continue
+            if not outstanding:
+                # Every item has been submitted and yielded.
+                return
+            result = completed.get()
+            outstanding -= 1
+            pending.pop(result.index, None)
+            if not ordered:
+                yield result
+            elif result.index == next_index:
+                yield result
+                next_index += 1
+            else:
+                buffered[result.index] = result
+    finally:
+        # The consumer stopped early, therefore, cancel the RPC
+        # requests that are still in flight.
+        for future in pending.values():
+            future.cancel()
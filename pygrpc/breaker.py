@@ -0,0 +1,283 @@
+import collections
+import threading
+import time
+
+from grpc.beta.interfaces import StatusCode
+from grpc.framework.interfaces.face import face
+
+from .interceptors import Interceptor
+from .retry import status_code
+
+# The states of a circuit.
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(face.LocalError):
+    """Raised in place of an RPC request whose circuit is open."""
+
+    def __init__(self, details):
+        super(CircuitOpenError, self).__init__(None, None,
+                                               StatusCode.UNAVAILABLE, details)
+
+
+class _Circuit(object):
+    """The state of a single circuit, e.g. of an RPC method or of an
+    endpoint.
+    """
+
+    def __init__(self, breaker):
+        self._breaker = breaker
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        # The `(failed, slow)` outcomes of the latest calls.
+        self._outcomes = collections.deque(maxlen=breaker.window)
+        self._failures = 0
+        self._slow = 0
+        self._opened = None
+        self._trials = 0
+        self._successes = 0
+
+    def available(self):
+        """Return `True` unless the circuit is open and its open period
+        has not elapsed. Unlike `allow`, it does not admit a call.
+        """
+        return (self.state != OPEN or
+                self._breaker._clock() >= self._opened +
+                self._breaker.open_seconds)
+
+    def allow(self):
+        """Return `True` if a call may proceed, and admit it."""
+        breaker = self._breaker
+        with self._lock:
+            if self.state == OPEN:
+                if breaker._clock() < self._opened + breaker.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._trials = 0
+                self._successes = 0
+            if self.state == HALF_OPEN:
+                if self._trials >= breaker.half_open_calls:
+                    return False
+                self._trials += 1
+            return True
+
+    def record(self, failed, slow=False):
+        """Record the outcome of a call that `allow` admitted."""
+        breaker = self._breaker
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if failed or slow:
+                    self._open()
+                else:
+                    self._successes += 1
+                    if self._successes >= breaker.half_open_calls:
+                        self._close()
+                return
+            if self.state == OPEN:
+                # A call that was admitted before the circuit opened.
+                return
+            outcomes = self._outcomes
+            if len(outcomes) == outcomes.maxlen:
+                old_failed, old_slow = outcomes[0]
+                self._failures -= old_failed
+                self._slow -= old_slow
+            outcomes.append((failed, slow))
+            self._failures += failed
+            self._slow += slow
+            calls = len(outcomes)
+            if calls >= breaker.min_calls and (
+                    self._failures >= breaker.error_rate * calls or
+                    (breaker.slow_call is not None and
+                     self._slow >= breaker.slow_rate * calls)):
+                self._open()
+
+    def release(self):
+        """Give back the admission of a call whose outcome is unknown,
+        e.g. of a response stream that was not read to the end, so that
+        a half-open circuit admits another trial call.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def _open(self):
+        breaker = self._breaker
+        self.state = OPEN
+        self._opened = breaker._clock()
+        # The counter is shared by the circuits.
+        with breaker._lock:
+            breaker.trips += 1
+
+    def _close(self):
+        self.state = CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+        self._slow = 0
+
+
+class _GuardedResponses(object):
+    """Record the outcome of a streaming RPC response when it ends, or
+    release its admission when it is closed or garbage collected before
+    its end.
+    """
+
+    def __init__(self, iterator, breaker, circuit):
+        self._iterator = iterator
+        self._breaker = breaker
+        self._circuit = circuit
+
+    def __iter__(self):
+        return self
+
+    def _record(self, exception=None):
+        circuit, self._circuit = self._circuit, None
+        if circuit is not None:
+            circuit.record(self._breaker.failed(exception))
+
+    def next(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._record()
+            raise
+        except Exception as exception:
+            self._record(exception)
+            raise
+
+    __next__ = next
+
+    def _release(self):
+        circuit, self._circuit = self._circuit, None
+        if circuit is not None:
+            circuit.release()
+
+    def close(self):
+        """Cancel the RPC request if it is still in flight and release
+        its admission.
+        """
+        if self._circuit is not None:
+            self._release()
+            cancel = getattr(self._iterator, 'cancel', None)
+            if cancel is not None:
+                cancel()
+
+    def __del__(self):
+        self._release()
+
+    def __getattr__(self, attr):
+        return getattr(self._iterator, attr)
+
+
+class CircuitBreaker(Interceptor):
+    """Circuit breakers with closed, open and half-open states.
+
+    A closed circuit opens when, among its latest `window` calls (and at
+    least `min_calls` of them), the fraction of failed calls reaches
+    `error_rate`, or the fraction of calls slower than `slow_call`
+    seconds reaches `slow_rate`. Calls to an open circuit fail fast with
+    a `CircuitOpenError`. After `open_seconds` the circuit is half-open:
+    it admits `half_open_calls` trial calls, closes if they all succeed
+    and opens again otherwise.
+
+    As an interceptor it keeps a circuit per RPC method. As the `breaker`
+    of a `PooledClient` it keeps a circuit per endpoint, and ejects the
+    endpoints whose circuit is open from the selection.
+    """
+
+    def __init__(self, window=20, min_calls=10, error_rate=0.5,
+                 slow_call=None, slow_rate=0.5, open_seconds=5.0,
+                 half_open_calls=1,
+                 codes=(StatusCode.UNAVAILABLE, StatusCode.DEADLINE_EXCEEDED,
+                        StatusCode.INTERNAL, StatusCode.UNKNOWN,
+                        StatusCode.RESOURCE_EXHAUSTED),
+                 clock=time.time):
+        """
+        :type codes: iterable
+        :param codes: The `grpc.beta.interfaces.StatusCode` values of the
+            failures, as opposed to errors of the caller, e.g.
+            `INVALID_ARGUMENT`, that do not open the circuit.
+        """
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.codes = frozenset(codes)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._circuits = {}
+        # The number of times a circuit opened, and the number of calls
+        # rejected by an open circuit.
+        self.trips = 0
+        self.rejected = 0
+
+    def circuit(self, key):
+        """Return the circuit of `key`, e.g. a qualified RPC method name
+        such as `RouteGuide.GetFeature`.
+        """
+        try:
+            return self._circuits[key]
+        except KeyError:
+            with self._lock:
+                return self._circuits.setdefault(key, _Circuit(self))
+
+    def state(self, key):
+        return self.circuit(key).state
+
+    def failed(self, exception):
+        """Return `True` if `exception` counts as a failure."""
+        return (exception is not None and
+                isinstance(exception, face.AbortionError) and
+                not isinstance(exception, face.CancellationError) and
+                status_code(exception) in self.codes)
+
+    def reject(self, key):
+        """Return the exception raised in place of a call to the open
+        circuit of `key`.
+        """
+        with self._lock:
+            self.rejected += 1
+        return CircuitOpenError('Circuit of {!r} is open.'.format(key))
+
+    def guard(self, circuit, call, future, unary_response):
+        """Issue the RPC request with `call()` and record its outcome in
+        the admitted `circuit`.
+        """
+        started = self._clock()
+        try:
+            response = call()
+        except Exception as exception:
+            circuit.record(self.failed(exception))
+            raise
+        if future:
+            def _done(response):
+                if response.cancelled():
+                    # Nothing succeeded nor failed, e.g. a cancelled
+                    # hedge: give back the admission.
+                    circuit.release()
+                    return
+                exception = response.exception()
+                circuit.record(self.failed(exception),
+                               exception is None and self._slow(started))
+            response.add_done_callback(_done)
+        elif unary_response:
+            circuit.record(False, self._slow(started))
+        else:
+            response = _GuardedResponses(response, self, circuit)
+        return response
+
+    def _slow(self, started):
+        return (self.slow_call is not None and
+                self._clock() - started > self.slow_call)
+
+    def intercept(self, details, request, proceed):
+        name = details.method.qualified_name
+        circuit = self.circuit(name)
+        if not circuit.allow():
+            raise self.reject(name)
+        return self.guard(circuit, lambda: proceed(details, request),
+                          details.future, details.method.unary_response)
@@ -0,0 +1,100 @@
+import collections
+import threading
+import time
+
+
+class ResponseCache(object):
+    """A thread-safe LRU cache of RPC response payloads with a time to
+    live.
+
+    Entries are keyed by the qualified RPC method name and the
+    serialized request, and store the serialized response, so that a
+    cached response can never be mutated by the caller that received
+    it.
+    """
+
+    def __init__(self, methods, ttl=60, max_entries=1024, max_bytes=None,
+                 clock=time.time):
+        """
+        :type methods: iterable
+        :param methods: The names or qualified names of the cacheable
+            RPC methods. Only UNARY_UNARY methods are cached.
+
+        :type ttl: float
+        :param ttl: The number of seconds an entry stays fresh.
+
+        :type max_entries: int
+        :param max_entries: The maximum number of entries, or `None`.
+
+        :type max_bytes: int
+        :param max_bytes: The maximum total size of the cached requests
+            and responses in bytes, or `None`.
+        """
+        self.methods = frozenset(methods)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Map each key to an `(expires, payload)` tuple, least recently
+        # used first.
+        self._entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the response payload cached for `key`, or `None`."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, payload = entry
+            if expires <= self._clock():
+                self.size -= _sizeof(key, payload)
+                self.misses += 1
+                return None
+            # Re-insert the entry as the most recently used.
+            self._entries[key] = entry
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        """Cache the response `payload` for `key`, evicting the least
+        recently used entries to stay within the limits.
+        """
+        size = _sizeof(key, payload)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= _sizeof(key, entry[1])
+            self._entries[key] = (self._clock() + self.ttl, payload)
+            self.size += size
+            while ((self.max_entries is not None and
+                    len(self._entries) > self.max_entries) or
+                   (self.max_bytes is not None and
+                    self.size > self.max_bytes)):
+                key, (_, payload) = self._entries.popitem(last=False)
+                self.size -= _sizeof(key, payload)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > self._clock()
+
+
+def _sizeof(key, payload):
+    return len(key[1]) + len(payload)
@@ -0,0 +1,507 @@
+import collections
+import itertools
+import struct
+import threading
+import time
+import timeit
+import warnings
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from grpc.framework.common.cardinality import Cardinality
+
+from .interceptors import Interceptor, selects
+from .metrics import Histogram
+from .pygrpc import _serialize
+from .retry import status_code
+
+# The first bytes of every capture session appended to a log file.
+MAGIC = b'PYGRPC\x00\x01'
+
+# The kinds of the records of a log file. A `CALL` record starts an RPC
+# request, a `MESSAGE` record holds a serialized request message, a
+# `CLOSE` record ends a request stream and a `DONE` record holds the
+# outcome of the RPC request.
+CALL = 1
+MESSAGE = 2
+CLOSE = 3
+DONE = 4
+
+# The header of a record: kind, call number, wall-clock time in seconds
+# and payload length. The call numbers wrap around at 2**32.
+_RECORD = struct.Struct('<BIdI')
+_CALL_NUMBERS = 2 ** 32
+# The payload of a `CALL` record, followed by the RPC method name.
+_CALL = struct.Struct('<Bd')
+# The payload of a `DONE` record, followed by the status code name.
+_DONE = struct.Struct('<I')
+
+_CARDINALITIES = (Cardinality.UNARY_UNARY, Cardinality.UNARY_STREAM,
+                  Cardinality.STREAM_UNARY, Cardinality.STREAM_STREAM)
+_NO_TIMEOUT = -1.0
+
+
+def _status(exception, cancelled=False):
+    if cancelled:
+        return 'CANCELLED'
+    if exception is None:
+        return 'OK'
+    code = status_code(exception)
+    return 'UNKNOWN' if code is None else code.name
+
+
+def _encode(record):
+    kind, call, at, payload = record
+    if kind == CALL:
+        name, cardinality, timeout = payload
+        payload = _CALL.pack(
+            _CARDINALITIES.index(cardinality),
+            _NO_TIMEOUT if timeout is None else timeout
+        ) + name.encode('utf-8')
+    elif kind == DONE:
+        responses, status = payload
+        payload = _DONE.pack(responses) + status.encode('ascii')
+    return _RECORD.pack(kind, call, at, len(payload)) + payload
+
+
+class _CapturedRequests(object):
+    """Capture the messages of a request stream as they are sent."""
+
+    def __init__(self, iterator, capture, call):
+        self._iterator = iter(iterator)
+        self._capture = capture
+        self._call = call
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        capture = self._capture
+        try:
+            message = next(self._iterator)
+        except StopIteration:
+            capture._pending.append((CLOSE, self._call, capture._clock(),
+                                     b''))
+            raise
+        capture._pending.append((MESSAGE, self._call, capture._clock(),
+                                 _serialize(message)))
+        return message
+
+    __next__ = next
+
+    def __getattr__(self, attr):
+        return getattr(self._iterator, attr)
+
+
+class _CapturedResponses(object):
+    """Capture the outcome of a streaming RPC response when it ends."""
+
+    def __init__(self, iterator, capture, call):
+        self._iterator = iterator
+        self._capture = capture
+        self._call = call
+        self._responses = 0
+
+    def __iter__(self):
+        return self
+
+    def _done(self, exception=None, cancelled=False):
+        capture, self._capture = self._capture, None
+        if capture is not None:
+            capture._done(self._call, self._responses, exception, cancelled)
+
+    def next(self):
+        try:
+            response = next(self._iterator)
+        except StopIteration:
+            self._done()
+            raise
+        except Exception as exception:
+            self._done(exception)
+            raise
+        self._responses += 1
+        return response
+
+    __next__ = next
+
+    def cancel(self):
+        self._done(cancelled=True)
+        return self._iterator.cancel()
+
+    def __getattr__(self, attr):
+        return getattr(self._iterator, attr)
+
+
+class Capture(Interceptor):
+    """An interceptor that captures the RPC requests to an append-only
+    binary log file: the RPC method, the timeout, the serialized request
+    messages with the time each one was sent, the end of the request
+    streams, and the outcome and the number of response messages.
+
+    The calling threads only queue the records; a background thread
+    writes and flushes them every `flush_interval` seconds. When more
+    than `max_pending` records are queued, new RPC requests are not
+    captured, and are counted in `dropped`.
+    """
+
+    def __init__(self, path, methods=None, flush_interval=1.0,
+                 max_pending=65536, clock=time.time):
+        """
+        :type path: str
+        :param path: The log file; a new capture session is appended to
+            it if it exists.
+
+        :type methods: iterable
+        :param methods: The names or qualified names of the captured RPC
+            methods, or `None` to capture every RPC method.
+        """
+        self.methods = None if methods is None else frozenset(methods)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._clock = clock
+        self._file = open(path, 'ab')
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self._pending = collections.deque()
+        self._calls = itertools.count()
+        # Guards `captured` and `dropped`, apart from `_lock` which is
+        # held while the log file is written.
+        self._counts_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run)
+        self._writer.daemon = True
+        self._writer.start()
+        self.captured = 0
+        self.dropped = 0
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            stopped = self._stop.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as exception:
+                # Keep the writer running, e.g. after a full disk.
+                warnings.warn('Capture to {!r} failed: {!r}'
+                              .format(self._file.name, exception),
+                              RuntimeWarning)
+
+    def flush(self):
+        """Write the queued records to the log file."""
+        pending = self._pending
+        records = []
+        # The records are written in the order in which they were
+        # queued, e.g. a `MESSAGE` record after its `CALL` record.
+        with self._lock:
+            try:
+                while True:
+                    records.append(_encode(pending.popleft()))
+            except IndexError:
+                pass
+            if records:
+                self._file.write(b''.join(records))
+                self._file.flush()
+
+    def close(self):
+        """Write the queued records and close the log file."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._writer.join()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _done(self, call, responses, exception=None, cancelled=False):
+        self._pending.append((DONE, call, self._clock(),
+                              (responses, _status(exception, cancelled))))
+
+    def intercept(self, details, request, proceed):
+        if self.methods is not None and not selects(self.methods,
+                                                    details.method):
+            return proceed(details, request)
+        pending = self._pending
+        if len(pending) >= self.max_pending or self._stop.is_set():
+            with self._counts_lock:
+                self.dropped += 1
+            return proceed(details, request)
+        with self._counts_lock:
+            self.captured += 1
+        call = next(self._calls) % _CALL_NUMBERS
+        method = details.method
+        now = self._clock()
+        # The qualified name replays the RPC request to the same service.
+        pending.append((CALL, call, now, (method.qualified_name,
+                                          method.cardinality,
+                                          details.timeout)))
+        if method.unary_request:
+            pending.append((MESSAGE, call, now, _serialize(request)))
+        else:
+            request = _CapturedRequests(request, self, call)
+        try:
+            response = proceed(details, request)
+        except Exception as exception:
+            self._done(call, 0, exception)
+            raise
+        if details.future:
+            def _done(response):
+                cancelled = response.cancelled()
+                exception = None if cancelled else response.exception()
+                self._done(call, int(exception is None and not cancelled),
+                           exception, cancelled)
+            response.add_done_callback(_done)
+        elif method.unary_response:
+            self._done(call, 1)
+        else:
+            response = _CapturedResponses(response, self, call)
+        return response
+
+
+# A captured RPC request. `started` and `ended` are wall-clock times in
+# seconds, `messages` is a list of `(offset, payload)` tuples whose
+# offset is relative to `started`, and `ended` and `status` are `None`
+# if the outcome was not captured.
+CapturedCall = collections.namedtuple('CapturedCall', [
+    'name', 'cardinality', 'timeout', 'started', 'messages', 'closed',
+    'ended', 'status', 'responses',
+])
+
+
+def _starts_session(data, position):
+    """Return whether a capture session plausibly starts at `position`:
+    the magic bytes followed by the end of the data, by another session
+    or by a `CALL` record.
+    """
+    if not data.startswith(MAGIC, position):
+        return False
+    position += len(MAGIC)
+    if position == len(data) or data.startswith(MAGIC, position):
+        return True
+    if position + _RECORD.size > len(data):
+        return False
+    kind, _, _, length = _RECORD.unpack_from(data, position)
+    return kind == CALL and position + _RECORD.size + length <= len(data)
+
+
+def _decode(data, position):
+    """Return the record at `position` as `_encode` receives it, and the
+    position of the next record, or `None` if the record is truncated.
+    """
+    if position + _RECORD.size > len(data):
+        return None
+    kind, call, at, length = _RECORD.unpack_from(data, position)
+    start = position + _RECORD.size
+    end = start + length
+    if kind not in (CALL, MESSAGE, CLOSE, DONE) or end > len(data):
+        return None
+    # A record that spans the start of a session was truncated when the
+    # capturing process ended, and the session was appended after it.
+    session = data.find(MAGIC, position + 1, end + len(MAGIC) - 1)
+    while session >= 0:
+        if _starts_session(data, session):
+            return None
+        session = data.find(MAGIC, session + 1, end + len(MAGIC) - 1)
+    payload = data[start:end]
+    try:
+        if kind == CALL:
+            cardinality, timeout = _CALL.unpack_from(payload)
+            payload = (payload[_CALL.size:].decode('utf-8'),
+                       _CARDINALITIES[cardinality],
+                       None if timeout == _NO_TIMEOUT else timeout)
+        elif kind == DONE:
+            payload = (_DONE.unpack_from(payload)[0],
+                       payload[_DONE.size:].decode('ascii'))
+    except (struct.error, IndexError, UnicodeDecodeError):
+        return None
+    return (kind, call, at, payload), end
+
+
+def read_log(path):
+    """Return the `CapturedCall` objects of the log file in the order
+    in which they started. Truncated records, at the end of the file or
+    of a capture session, are skipped.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    calls = []
+    # The calls of the current session by call number; a call number
+    # that wrapped around starts a new call.
+    session = {}
+    position = 0
+    while position < len(data):
+        if data.startswith(MAGIC, position):
+            session = {}
+            position += len(MAGIC)
+            continue
+        decoded = _decode(data, position)
+        if decoded is None:
+            # Skip to the next session, if any.
+            position = data.find(MAGIC, position + 1)
+            if position < 0:
+                break
+            continue
+        (kind, number, at, payload), position = decoded
+        if kind == CALL:
+            name, cardinality, timeout = payload
+            session[number] = call = {
+                'name': name, 'cardinality': cardinality,
+                'timeout': timeout, 'started': at, 'messages': [],
+                'closed': None, 'ended': None, 'status': None,
+                'responses': None,
+            }
+            calls.append(call)
+            continue
+        call = session.get(number)
+        if call is None:
+            continue
+        if kind == MESSAGE:
+            call['messages'].append((at - call['started'], payload))
+        elif kind == CLOSE:
+            call['closed'] = at
+        elif kind == DONE:
+            call['ended'] = at
+            call['responses'], call['status'] = payload
+    return sorted((CapturedCall(**call) for call in calls),
+                  key=lambda call: call.started)
+
+
+class _Stats(object):
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = collections.Counter()
+        self.latency = Histogram()
+        self.captured_latency = Histogram()
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'errors': dict(self.errors),
+            'latency': self.latency.snapshot(),
+            'captured_latency': self.captured_latency.snapshot(),
+        }
+
+
+class Replayer(object):
+    """Replay captured RPC requests through a `Client` object, at the
+    original pace, scaled, or as fast as possible.
+
+    The request payloads are sent as captured and the responses are not
+    deserialized, i.e. the RPC requests are issued with `raw=True`.
+    """
+
+    def __init__(self, client, calls, speed=1.0, concurrency=64,
+                 clock=timeit.default_timer, sleep=time.sleep):
+        """
+        :type calls: iterable
+        :param calls: The `CapturedCall` objects, e.g. `read_log(path)`.
+
+        :type speed: float
+        :param speed: The factor by which the original pace, including
+            the pace of the messages of the request streams, is sped
+            up, or `None` to replay as fast as possible.
+
+        :type concurrency: int
+        :param concurrency: The maximum number of RPC requests in
+            flight.
+        """
+        self._client = client
+        self._calls = sorted(calls, key=lambda call: call.started)
+        self.speed = float(speed) if speed else None
+        self.concurrency = concurrency
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def _wait(self, until):
+        delay = until - self._clock()
+        if delay > 0:
+            self._sleep(delay)
+
+    def _requests(self, call, started):
+        for offset, payload in call.messages:
+            if self.speed:
+                self._wait(started + offset / self.speed)
+            yield payload
+
+    def _issue(self, call, stats):
+        """Issue the captured RPC request and record its outcome in
+        the `stats` dictionary of the RPC method.
+        """
+        started = self._clock()
+        if call.cardinality in (Cardinality.UNARY_UNARY,
+                                Cardinality.UNARY_STREAM):
+            request = call.messages[0][1] if call.messages else b''
+        else:
+            request = self._requests(call, started)
+        exception = None
+        try:
+            response = self._client.request(call.name, request, raw=True,
+                                            timeout=call.timeout)
+            if call.cardinality in (Cardinality.UNARY_STREAM,
+                                    Cardinality.STREAM_STREAM):
+                for _ in response:
+                    pass
+        except Exception as e:
+            exception = e
+        latency = self._clock() - started
+        with self._lock:
+            stats = stats[call.name]
+            stats.calls += 1
+            stats.latency.add(latency)
+            if call.ended is not None:
+                stats.captured_latency.add(call.ended - call.started)
+            if exception is not None:
+                stats.errors[_status(exception)] += 1
+
+    def run(self):
+        """Replay the RPC requests and return a dictionary of the
+        latency distributions per RPC method, and of the lag of the
+        RPC requests behind their schedule.
+        """
+        stats = collections.defaultdict(_Stats)
+        lag = Histogram()
+        calls = queue.Queue(maxsize=self.concurrency)
+
+        def work():
+            while True:
+                call = calls.get()
+                if call is None:
+                    return
+                self._issue(call, stats)
+
+        workers = [threading.Thread(target=work)
+                   for _ in xrange(self.concurrency)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        started = self._clock()
+        first = self._calls[0].started if self._calls else 0
+        for call in self._calls:
+            if self.speed:
+                scheduled = started + (call.started - first) / self.speed
+                self._wait(scheduled)
+                calls.put(call)
+                lag.add(max(0.0, self._clock() - scheduled))
+            else:
+                calls.put(call)
+        for _ in workers:
+            calls.put(None)
+        for worker in workers:
+            worker.join()
+        elapsed = self._clock() - started
+        return {
+            'calls': len(self._calls),
+            'elapsed': elapsed,
+            'speed': self.speed,
+            'lag': lag.snapshot(),
+            'methods': dict((name, method_stats.snapshot())
+                            for name, method_stats in stats.iteritems()),
+        }
@@ -0,0 +1,68 @@
+import threading
+
+
+class _Call(object):
+    """An RPC request in flight that identical requests wait on."""
+    __slots__ = ('event', 'result', 'exception')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class Coalescer(object):
+    """Coalesce concurrent identical RPC requests, so that they share a
+    single outgoing RPC request and all receive its response or its
+    exception.
+
+    Requests are identical when they have the same key, i.e. the same
+    qualified RPC method name and serialized request.
+    """
+
+    def __init__(self, methods):
+        """
+        :type methods: iterable
+        :param methods: The names or qualified names of the RPC methods
+            whose requests are coalesced. Only UNARY_UNARY methods are
+            coalesced.
+        """
+        self.methods = frozenset(methods)
+        self._lock = threading.Lock()
+        self._calls = {}
+        # The number of RPC requests issued, and the number of requests
+        # that were served by an identical request already in flight.
+        self.calls = 0
+        self.deduplicated = 0
+
+    def do(self, key, fn):
+        """Return the result of `fn()`, or of the call of an identical
+        request with the same `key` that is already in flight.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+            else:
+                self.deduplicated += 1
+                leader = False
+        if not leader:
+            call.event.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as exception:
+            # E.g. a `KeyboardInterrupt` in the leader also ends the
+            # identical requests rather than returning them `None`.
+            call.exception = exception
+            raise
+        finally:
+            # Later identical requests issue a new RPC request.
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
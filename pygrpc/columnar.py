@@ -0,0 +1,145 @@
+import array
+import operator
+
+from google.protobuf.descriptor import FieldDescriptor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _int64_typecode():
+    for typecode in ('q', 'l'):
+        try:
+            if array.array(typecode).itemsize == 8:
+                return typecode
+        except ValueError:
+            pass
+    return None
+
+
+# The NumPy dtypes and `array` typecodes of the scalar field types. The
+# other field types, e.g. strings, are stored as lists, or as NumPy
+# object arrays.
+_TYPES = {
+    FieldDescriptor.CPPTYPE_INT32: ('int32', 'i'),
+    FieldDescriptor.CPPTYPE_UINT32: ('uint32', 'I'),
+    FieldDescriptor.CPPTYPE_INT64: ('int64', _int64_typecode()),
+    FieldDescriptor.CPPTYPE_UINT64: ('uint64', None),
+    FieldDescriptor.CPPTYPE_DOUBLE: ('float64', 'd'),
+    FieldDescriptor.CPPTYPE_FLOAT: ('float32', 'f'),
+    FieldDescriptor.CPPTYPE_BOOL: ('bool', 'B'),
+    FieldDescriptor.CPPTYPE_ENUM: ('int32', 'i'),
+}
+
+
+def _field(descriptor, path):
+    """Return the `FieldDescriptor` of the scalar field at the dotted
+    `path` of the `descriptor` message type.
+    """
+    parts = path.split('.')
+    for i, part in enumerate(parts):
+        field = descriptor.fields_by_name.get(part)
+        if field is None:
+            raise ValueError('Message type "{}" has no field "{}"!'
+                             .format(descriptor.full_name, part))
+        if field.label == FieldDescriptor.LABEL_REPEATED:
+            raise ValueError('Field "{}" is repeated!'.format(path))
+        if i < len(parts) - 1:
+            if field.message_type is None:
+                raise ValueError('Field "{}" is not a message!'
+                                 .format('.'.join(parts[:i + 1])))
+            descriptor = field.message_type
+    if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        raise ValueError('Field "{}" is a message!'.format(path))
+    return field
+
+
+class _Column(object):
+    """The values of a single field, appended a chunk at a time."""
+
+    def __init__(self, field, use_numpy):
+        dtype, typecode = _TYPES.get(field.cpp_type, ('object', None))
+        self._use_numpy = use_numpy
+        if use_numpy:
+            self._dtype = dtype
+            self._chunks = []
+        elif typecode is not None:
+            self._values = array.array(typecode)
+        else:
+            self._values = []
+
+    def extend(self, values):
+        if self._use_numpy:
+            self._chunks.append(numpy.array(values, dtype=self._dtype))
+        else:
+            self._values.extend(values)
+
+    def result(self):
+        if not self._use_numpy:
+            return self._values
+        if not self._chunks:
+            return numpy.empty(0, dtype=self._dtype)
+        return numpy.concatenate(self._chunks)
+
+
+def columns(responses, fields, chunk_size=65536, use_numpy=None):
+    """Extract the `fields` of the messages of a streaming RPC response
+    into compact columns, e.g. `columns(responses, ['location.latitude',
+    'location.longitude', 'name'])`.
+
+    The values are copied into a column a chunk at a time, and the
+    messages are released as soon as their values are copied, so that
+    only the columns are kept in memory.
+
+    :type fields: list
+    :param fields: The dotted paths of the scalar fields to extract.
+
+    :type chunk_size: int
+    :param chunk_size: The number of messages whose values are copied
+        into the columns at once.
+
+    :type use_numpy: bool
+    :param use_numpy: Return NumPy arrays instead of `array.array`
+        objects. Defaults to `True` if NumPy is installed. Fields that
+        do not have a numeric type are returned as lists, or as NumPy
+        object arrays.
+
+    :rtype: dict
+    :returns: A dictionary mapping each field path to its column.
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    elif use_numpy and numpy is None:
+        raise ImportError('NumPy is required for use_numpy=True!')
+    fields = list(fields)
+    getters = [operator.attrgetter(path) for path in fields]
+    chunk = [[] for _ in fields]
+    appends = [(getter, values.append)
+               for getter, values in zip(getters, chunk)]
+    builders = None
+    count = 0
+    for message in responses:
+        if builders is None:
+            # The column types are read from the message type of the
+            # first response.
+            builders = [_Column(_field(message.DESCRIPTOR, path), use_numpy)
+                        for path in fields]
+        for getter, append in appends:
+            append(getter(message))
+        count += 1
+        if count == chunk_size:
+            for builder, values in zip(builders, chunk):
+                builder.extend(values)
+                del values[:]
+            count = 0
+    if builders is None:
+        # The stream was empty, therefore, the column types are unknown.
+        empty = (lambda: numpy.empty(0)) if use_numpy else list
+        return dict((path, empty()) for path in fields)
+    if count:
+        for builder, values in zip(builders, chunk):
+            builder.extend(values)
+    return dict((path, builder.result())
+                for path, builder in zip(fields, builders))
@@ -0,0 +1,211 @@
+import collections
+import random as random_module
+import threading
+import timeit
+import zlib
+
+from grpc.beta import interfaces
+
+from .interceptors import lookup
+
+# The compression algorithms.
+GZIP = 'gzip'
+DEFLATE = 'deflate'
+
+# The `zlib` window bits of each algorithm: a gzip header and trailer,
+# or a zlib (RFC 1950) stream as `deflate` denotes in HTTP and gRPC.
+_WBITS = {GZIP: 16 + zlib.MAX_WBITS, DEFLATE: zlib.MAX_WBITS}
+
+# The protocol options of the RPC requests, built once since they are
+# immutable.
+_ENABLED = interfaces.grpc_call_options(disable_compression=False)
+_DISABLED = interfaces.grpc_call_options(disable_compression=True)
+
+
+def _compressed_size(payload, algorithm, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[algorithm])
+    return len(compressor.compress(payload)) + len(compressor.flush())
+
+
+class _MethodStats(object):
+
+    def __init__(self):
+        self.enabled_calls = 0
+        self.disabled_calls = 0
+        self.messages = 0
+        self.bytes = 0
+        self.estimated_bytes = 0
+        self.estimate_seconds = 0.0
+
+    def snapshot(self):
+        return {
+            'enabled_calls': self.enabled_calls,
+            'disabled_calls': self.disabled_calls,
+            'messages': self.messages,
+            'bytes': self.bytes,
+            'estimated_bytes': self.estimated_bytes,
+            'estimated_ratio': (float(self.estimated_bytes) / self.bytes
+                                if self.bytes else None),
+            'estimate_seconds': self.estimate_seconds,
+        }
+
+
+class _MeasuredRequests(object):
+    """Sample the request messages of a stream as they are sent."""
+
+    def __init__(self, iterator, compression, name):
+        self._iterator = iter(iterator)
+        self._compression = compression
+        self._name = name
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        message = next(self._iterator)
+        compression = self._compression
+        if compression._random.random() < compression.sample:
+            compression._measure(self._name, message)
+        return message
+
+    __next__ = next
+
+    def __getattr__(self, attr):
+        return getattr(self._iterator, attr)
+
+
+class Compression(object):
+    """Per-client and per-method settings that allow or forbid the
+    compression of the RPC requests.
+
+    The beta API of gRPC takes no compression algorithm per RPC request:
+    the channel compresses the request messages with the algorithm that
+    gRPC core is configured with, if any, and the client can only
+    disable it per RPC request with the `disable_compression` protocol
+    option. These settings are therefore advisory: they set that option,
+    disabling compression for the unary RPC requests whose serialized
+    message is smaller than the threshold of their method and for the
+    methods without a threshold, and have no effect on a channel that
+    does not compress. The response messages are compressed at the
+    discretion of the server.
+
+    To tune the thresholds, a `sample` fraction of the request messages
+    of the RPC requests that allow compression is compressed with `zlib`
+    on the calling thread, which estimates the size after compression;
+    see `snapshot`.
+    """
+
+    def __init__(self, threshold=1024, methods=None, algorithm=GZIP,
+                 level=6, sample=0.01, random=None,
+                 clock=timeit.default_timer):
+        """
+        :type threshold: int
+        :param threshold: The serialized size in bytes from which the
+            message of a unary RPC request may be compressed, or `None`
+            to disable compression by default.
+
+        :type methods: dict
+        :param methods: A dictionary mapping RPC method names or
+            qualified method names to the thresholds that override the
+            default for them.
+
+        :type algorithm: str
+        :param algorithm: The algorithm of the estimates, `GZIP` or
+            `DEFLATE`. It should match the algorithm of the channel.
+
+        :type level: int
+        :param level: The `zlib` compression level of the estimates.
+
+        :type sample: float
+        :param sample: The fraction of the request messages of the RPC
+            requests that allow compression whose size after compression
+            is estimated.
+
+        :type random: random.Random
+        :param random: The random number generator that samples the
+            messages, or `None` for a new one.
+        """
+        if algorithm not in _WBITS:
+            raise ValueError('Unknown compression algorithm "{}"!'
+                             .format(algorithm))
+        self.threshold = threshold
+        self.methods = dict(methods or {})
+        self.algorithm = algorithm
+        self.level = level
+        self.sample = sample
+        self._random = random_module.Random() if random is None else random
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._methods = collections.defaultdict(_MethodStats)
+
+    def threshold_for(self, method):
+        """Return the threshold of the `method` RPC method, or `None` if
+        its RPC requests are never compressed.
+        """
+        return lookup(self.methods, method, self.threshold)
+
+    def prepare(self, method, request_or_request_iterator):
+        """Return the request argument and the protocol options of an
+        RPC request of `method`.
+        """
+        threshold = self.threshold_for(method)
+        name = method.qualified_name
+        if threshold is None:
+            self._count(name, False)
+            return request_or_request_iterator, _DISABLED
+        if not method.unary_request:
+            self._count(name, True)
+            if self.sample > 0:
+                request_or_request_iterator = _MeasuredRequests(
+                    request_or_request_iterator, self, name
+                )
+            return request_or_request_iterator, _ENABLED
+        request = request_or_request_iterator
+        size = (len(request) if isinstance(request, bytes) else
+                request.ByteSize())
+        if size < threshold:
+            self._count(name, False)
+            return request, _DISABLED
+        self._count(name, True)
+        if self._random.random() < self.sample:
+            self._measure(name, request)
+        return request, _ENABLED
+
+    def _count(self, name, enabled):
+        with self._lock:
+            stats = self._methods[name]
+            if enabled:
+                stats.enabled_calls += 1
+            else:
+                stats.disabled_calls += 1
+
+    def _measure(self, name, message):
+        payload = (message if isinstance(message, bytes) else
+                   message.SerializeToString())
+        # The wall-clock time of the calling thread: the process CPU
+        # time would include the other threads.
+        started = self._clock()
+        size = _compressed_size(payload, self.algorithm, self.level)
+        elapsed = self._clock() - started
+        with self._lock:
+            stats = self._methods[name]
+            stats.messages += 1
+            stats.bytes += len(payload)
+            stats.estimated_bytes += size
+            stats.estimate_seconds += elapsed
+
+    def snapshot(self):
+        """Return a dictionary mapping each qualified RPC method name,
+        e.g. `RouteGuide.GetFeature`, to a dictionary of its compression
+        statistics: the RPC requests that allowed and disabled
+        compression, and the sampled messages, their bytes, their
+        estimated bytes after compression, the estimated ratio and the
+        seconds spent estimating.
+        """
+        with self._lock:
+            return dict((name, stats.snapshot())
+                        for name, stats in self._methods.iteritems())
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
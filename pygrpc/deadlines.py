@@ -0,0 +1,52 @@
+import contextlib
+import threading
+import time
+
+from grpc.beta.interfaces import StatusCode
+from grpc.framework.interfaces.face import face
+
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def deadline(timeout):
+    """Bound every RPC request that the current thread issues within the
+    block by an absolute deadline `timeout` seconds from now.
+
+    The timeout of each RPC request is reduced to the time remaining
+    until the deadline, so that nested calls inherit the remaining
+    budget of their caller. A nested block cannot extend the deadline of
+    an enclosing one.
+
+    :type timeout: float
+    :param timeout: The number of seconds until the deadline.
+    """
+    previous = getattr(_local, 'deadline', None)
+    expires = time.time() + timeout
+    if previous is not None:
+        expires = min(expires, previous)
+    _local.deadline = expires
+    try:
+        yield expires
+    finally:
+        _local.deadline = previous
+
+
+def remaining():
+    """Return the seconds remaining until the deadline of the current
+    thread, or `None` outside of a `deadline` block.
+    """
+    expires = getattr(_local, 'deadline', None)
+    if expires is None:
+        return None
+    return expires - time.time()
+
+
+def expired(name):
+    """Return the exception raised in place of an RPC request whose
+    deadline has already passed.
+    """
+    return face.ExpirationError(
+        None, None, StatusCode.DEADLINE_EXCEEDED,
+        'Deadline of RPC method "{}" passed before it was sent.'.format(name)
+    )
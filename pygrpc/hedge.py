@@ -0,0 +1,196 @@
+import collections
+import threading
+import timeit
+
+from grpc.framework.common.cardinality import Cardinality
+
+from .interceptors import Interceptor, selects
+from .metrics import Histogram
+
+
+class _Slot(object):
+    """The outstanding slot of a duplicate request, released once: when
+    the request completes or, synchronously, when another request wins.
+    """
+
+    def __init__(self, hedger):
+        self._hedger = hedger
+        self._held = True
+
+    def release(self, _=None):
+        hedger = self._hedger
+        with hedger._lock:
+            if self._held:
+                self._held = False
+                hedger.outstanding -= 1
+
+
+class Hedger(Interceptor):
+    """An interceptor that hedges the UNARY_UNARY RPC requests of
+    idempotent methods: if a request has not completed after a delay, a
+    duplicate request is sent, the first successful response is returned
+    and the other requests are cancelled.
+
+    With a `PooledClient` the duplicate requests are spread across the
+    channels by its selection policy, so that a hedge avoids the slow
+    channel or backend when the policy is `LeastOutstanding`.
+
+    Once a method is hedged, its requests, including the first one, are
+    issued as future RPC requests. Therefore, the response cache and the
+    coalescer of the client do not apply to them, and neither does a
+    `Retrier` placed after the hedger; place it before the hedger to
+    retry the hedged request as a whole.
+    """
+
+    def __init__(self, methods, delay=None, quantile=0.95, min_samples=20,
+                 max_hedges=1, max_outstanding=16,
+                 clock=timeit.default_timer):
+        """
+        :type methods: iterable
+        :param methods: The names or qualified names of the hedged RPC
+            methods.
+
+        :type delay: float
+        :param delay: The seconds to wait before each duplicate request,
+            or `None` to wait for the `quantile` of the latencies
+            observed for the method.
+
+        :type quantile: float
+        :param quantile: The latency quantile used as the delay.
+
+        :type min_samples: int
+        :param min_samples: The number of latencies observed for a method
+            before its requests are hedged with the `quantile` delay.
+
+        :type max_hedges: int
+        :param max_hedges: The maximum number of duplicates of a request.
+
+        :type max_outstanding: int
+        :param max_outstanding: The maximum number of duplicate requests
+            in flight across all of the methods, or `None`.
+        """
+        self.methods = frozenset(methods)
+        self.delay = delay
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.max_outstanding = max_outstanding
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._latencies = collections.defaultdict(Histogram)
+        self.outstanding = 0
+        # The number of duplicate requests sent, and the number of them
+        # that returned the response.
+        self.hedges = 0
+        self.wins = 0
+
+    def delay_for(self, method):
+        """Return the hedging delay of the `method` qualified RPC method
+        name, or `None` if its requests are not hedged yet.
+        """
+        if self.delay is not None:
+            return self.delay
+        with self._lock:
+            latencies = self._latencies[method]
+            if latencies.count < self.min_samples:
+                return None
+            return latencies.quantile(self.quantile)
+
+    def _observe(self, method, latency):
+        with self._lock:
+            self._latencies[method].add(latency)
+
+    def _acquire(self):
+        """Return the `_Slot` of a new duplicate request, or `None` if
+        too many of them are in flight.
+        """
+        with self._lock:
+            if (self.max_outstanding is not None and
+                    self.outstanding >= self.max_outstanding):
+                return None
+            self.outstanding += 1
+            self.hedges += 1
+        return _Slot(self)
+
+    def intercept(self, details, request, proceed):
+        if (details.future or not selects(self.methods, details.method) or
+                details.cardinality is not Cardinality.UNARY_UNARY):
+            return proceed(details, request)
+        name = details.method.qualified_name
+        delay = self.delay_for(name)
+        if delay is None:
+            sent = self._clock()
+            response = proceed(details, request)
+            self._observe(name, self._clock() - sent)
+            return response
+        return self._hedge(details, request, proceed, delay)
+
+    def _hedge(self, details, request, proceed, delay):
+        done = threading.Event()
+        deadline = self._clock() + details.timeout
+        # The `(future, sent, slot)` tuples of the requests, first one
+        # first; the first request has no slot.
+        attempts = []
+
+        def issue(details, slot=None):
+            future = proceed(details, request)
+            attempts.append((future, self._clock(), slot))
+            future.add_done_callback(lambda _: done.set())
+            return future
+
+        issue(details._replace(future=True))
+        hedges = 0
+        while True:
+            # Clear the event before inspecting the futures, so that a
+            # request that completes meanwhile wakes up the wait below.
+            done.clear()
+            for i, (future, _, _) in enumerate(attempts):
+                if (future.done() and not future.cancelled() and
+                        future.exception() is None):
+                    return self._won(details.method.qualified_name,
+                                     attempts, i)
+            if all(future.done() for future, _, _ in attempts):
+                # Every request failed: raise the failure of the first.
+                return attempts[0][0].result()
+            now = self._clock()
+            wait = None
+            if hedges < self.max_hedges and now < deadline:
+                wait = attempts[-1][1] + delay - now
+                if wait <= 0:
+                    hedges += 1
+                    slot = self._acquire()
+                    if slot is not None:
+                        try:
+                            future = issue(details._replace(
+                                timeout=deadline - now, future=True,
+                                started=None
+                            ), slot)
+                        except Exception:
+                            slot.release()
+                            hedges = self.max_hedges
+                        else:
+                            future.add_done_callback(slot.release)
+                    else:
+                        # Too many duplicate requests are in flight.
+                        hedges = self.max_hedges
+                    continue
+            done.wait(wait)
+
+    def _won(self, method, attempts, winner):
+        future = attempts[winner][0]
+        for i, (other, _, slot) in enumerate(attempts):
+            if i != winner:
+                other.cancel()
+            # The done callbacks may run after this returns, e.g. when a
+            # cancellation completes asynchronously; the slots are free
+            # as of now.
+            if slot is not None:
+                slot.release()
+        # The latency of the first request, even if it lost, so that the
+        # delay is not biased towards the fastest responses. A cancelled
+        # first request contributes the time it ran, a lower bound.
+        self._observe(method, self._clock() - attempts[0][1])
+        if winner:
+            with self._lock:
+                self.wins += 1
+        return future.result()
@@ -0,0 +1,92 @@
+import collections
+
+
+class CallDetails(collections.namedtuple('CallDetails', (
+        'name', 'cardinality', 'timeout', 'future', 'method', 'started'))):
+    """The details of an RPC request passed through the interceptors.
+
+    :type name: str
+    :param name: The name of the RPC method, e.g. `GetFeature`.
+
+    :type cardinality: grpc.framework.common.cardinality.Cardinality
+    :param cardinality: The cardinality of the RPC method.
+
+    :type timeout: float
+    :param timeout: The timeout of the RPC request in seconds.
+
+    :type future: bool
+    :param future: `True` if the RPC request returns a future object.
+
+    :param method: The dispatch metadata of the RPC method, resolved
+        when its module was loaded. Its `qualified_name`, e.g.
+        `RouteGuide.GetFeature`, tells apart the services that define
+        the same method name.
+
+    :type started: float
+    :param started: The metrics clock time at which the client started
+        handling the RPC request, or `None` without metrics.
+    """
+    __slots__ = ()
+
+
+class Interceptor(object):
+    """An element of the interceptor chain of a `Client` object.
+
+    Override `intercept` to act around each RPC request: inspect or
+    replace the `details` (e.g. `details._replace(timeout=1)`) and the
+    request, call `proceed` zero or more times, and inspect or wrap the
+    response it returns: a response message, a response iterator or a
+    future object, depending on the cardinality and `details.future`.
+    """
+
+    def intercept(self, details, request, proceed):
+        """Return the response of the RPC request.
+
+        :type details: CallDetails
+        :param details: The details of the RPC request.
+
+        :param request: The request message, or the request iterator.
+
+        :type proceed: callable
+        :param proceed: Call `proceed(details, request)` to pass the RPC
+            request to the next interceptor, or to the stub.
+        """
+        return proceed(details, request)
+
+
+def chain(interceptors, terminal):
+    """Return a `proceed(details, request)` callable that passes an RPC
+    request through the `interceptors`, first one first, and then to
+    `terminal`. The chain is composed once, not on every RPC request.
+    """
+    proceed = terminal
+    for interceptor in reversed(interceptors):
+        proceed = _link(interceptor.intercept, proceed)
+    return proceed
+
+
+def _link(intercept, proceed):
+    def call(details, request):
+        return intercept(details, request, proceed)
+    return call
+
+
+def lookup(mapping, method, default=None):
+    """Return the value of the `method` RPC method in the `mapping`
+    dictionary, keyed by qualified method names (e.g.
+    `RouteGuide.GetFeature`) or method names (e.g. `GetFeature`). A
+    qualified method name takes precedence over a method name.
+    """
+    for key in (method.qualified_name, method.name):
+        try:
+            return mapping[key]
+        except KeyError:
+            pass
+    return default
+
+
+def selects(names, method):
+    """Return `True` if the `names` collection of qualified method names
+    and method names includes the `method` RPC method.
+    """
+    return method.qualified_name in names or method.name in names
@@ -0,0 +1,268 @@
+import math
+import threading
+import timeit
+
+from grpc.beta.interfaces import StatusCode
+from grpc.framework.interfaces.face import face
+
+from .interceptors import Interceptor
+from .retry import status_code
+
+
+class LimitExceededError(face.LocalError):
+    """Raised in place of an RPC request over the concurrency limit."""
+
+    def __init__(self, details):
+        super(LimitExceededError, self).__init__(
+            None, None, StatusCode.RESOURCE_EXHAUSTED, details
+        )
+
+
+class AIMDLimit(object):
+    """Additive increase, multiplicative decrease: grow the limit by one
+    after a successful call that used at least half of it, and multiply
+    it by `backoff` after a dropped call, i.e. one that failed with an
+    overload status code or took longer than `latency` seconds.
+    """
+
+    def __init__(self, initial=20, min_limit=1, max_limit=1000,
+                 backoff=0.9, latency=None):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency = latency
+
+    def update(self, latency, inflight, dropped):
+        """Return the new limit after a call that took `latency` seconds
+        while `inflight` calls were in flight.
+        """
+        if dropped or (self.latency is not None and latency > self.latency):
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif inflight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+        return self.limit
+
+
+class GradientLimit(object):
+    """Adjust the limit by the gradient between the long-term and the
+    short-term average latencies: the limit shrinks as queueing inflates
+    the recent latencies, and grows by about the square root of the limit
+    while they stay within `tolerance` times the long-term average.
+    """
+
+    def __init__(self, initial=20, min_limit=1, max_limit=1000,
+                 smoothing=0.2, tolerance=1.5, long_window=600,
+                 short_window=10):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        # The factors of the exponential moving averages.
+        self._long_factor = 2.0 / (long_window + 1)
+        self._short_factor = 2.0 / (short_window + 1)
+        self._long = None
+        self._short = None
+
+    def update(self, latency, inflight, dropped):
+        if dropped:
+            self.limit = max(self.min_limit, self.limit * 0.5)
+            return self.limit
+        if self._long is None:
+            self._long = self._short = latency
+        else:
+            self._long += (latency - self._long) * self._long_factor
+            self._short += (latency - self._short) * self._short_factor
+        if self._short <= 0:
+            return self.limit
+        gradient = max(0.5, min(1.0,
+                                self.tolerance * self._long / self._short))
+        # Grow the limit only while at least half of it is used.
+        queue = math.sqrt(self.limit) if inflight * 2 >= self.limit else 0
+        limit = self.limit * gradient + queue
+        limit = (self.limit * (1 - self.smoothing) + limit * self.smoothing)
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+        return self.limit
+
+
+class _Released(object):
+    """Release the slot of a streaming RPC response when it ends, is
+    closed or is garbage collected, e.g. when the caller breaks out of
+    the loop over the responses.
+    """
+
+    def __init__(self, iterator, release):
+        self._iterator = iterator
+        self._release = release
+
+    def _done(self, exception=None):
+        release, self._release = self._release, None
+        if release is not None:
+            release(exception)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._done()
+            raise
+        except Exception as exception:
+            self._done(exception)
+            raise
+
+    __next__ = next
+
+    def cancel(self):
+        self._done()
+        return self._iterator.cancel()
+
+    def close(self):
+        """Cancel the RPC request if it is still in flight and release
+        its slot.
+        """
+        if self._release is not None:
+            self._done()
+            cancel = getattr(self._iterator, 'cancel', None)
+            if cancel is not None:
+                cancel()
+
+    def __del__(self):
+        self._done()
+
+    def __getattr__(self, attr):
+        return getattr(self._iterator, attr)
+
+
+class ConcurrencyLimiter(Interceptor):
+    """An interceptor that caps the number of RPC requests in flight at
+    a limit that adapts to the observed latencies and errors.
+
+    Unary, streaming and future RPC requests hold a slot until they
+    complete; a response stream that is not read to the end holds it
+    until it is closed or garbage collected. RPC requests over the limit
+    wait for a slot if `block` is `True`, and otherwise raise a
+    `LimitExceededError`. The time spent waiting is deducted from the
+    timeout of the RPC request.
+    """
+
+    def __init__(self, limit=None, block=True, max_queue=None,
+                 queue_timeout=None, clock=timeit.default_timer,
+                 codes=(StatusCode.DEADLINE_EXCEEDED,
+                        StatusCode.RESOURCE_EXHAUSTED,
+                        StatusCode.UNAVAILABLE)):
+        """
+        :type limit: object
+        :param limit: The limit algorithm, `AIMDLimit()` (default) or
+            `GradientLimit()`.
+
+        :type block: bool
+        :param block: Wait for a slot instead of rejecting the RPC
+            requests over the limit.
+
+        :type max_queue: int
+        :param max_queue: The maximum number of waiting RPC requests, or
+            `None`. The RPC requests beyond it are rejected.
+
+        :type queue_timeout: float
+        :param queue_timeout: The maximum number of seconds to wait for a
+            slot, or `None` to wait up to the timeout of the RPC request.
+
+        :type codes: iterable
+        :param codes: The `grpc.beta.interfaces.StatusCode` values that
+            signal an overload and shrink the limit.
+        """
+        self._limit = AIMDLimit() if limit is None else limit
+        self.block = block
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.codes = frozenset(codes)
+        self._clock = clock
+        self._condition = threading.Condition()
+        self.inflight = 0
+        self.queued = 0
+        self.rejected = 0
+
+    @property
+    def limit(self):
+        """The current number of RPC requests allowed in flight."""
+        return max(1, int(self._limit.limit))
+
+    def _acquire(self, details):
+        """Take a slot for the RPC request of `details`, and return the
+        number of seconds it waited in the queue.
+        """
+        with self._condition:
+            if self.inflight < self.limit:
+                self.inflight += 1
+                return 0
+            if not self.block or (self.max_queue is not None and
+                                  self.queued >= self.max_queue):
+                self.rejected += 1
+                raise LimitExceededError(
+                    'Concurrency limit of {} reached.'.format(self.limit)
+                )
+            timeout = self.queue_timeout
+            if timeout is None or timeout > details.timeout:
+                timeout = details.timeout
+            queued = self._clock()
+            expires = queued + timeout
+            self.queued += 1
+            try:
+                while self.inflight >= self.limit:
+                    remaining = expires - self._clock()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise LimitExceededError(
+                            'No slot within the concurrency limit of {} '
+                            'became free.'.format(self.limit)
+                        )
+                    self._condition.wait(remaining)
+            finally:
+                self.queued -= 1
+            self.inflight += 1
+            return self._clock() - queued
+
+    def _release(self, started, sample, exception):
+        dropped = (isinstance(exception, face.AbortionError) and
+                   status_code(exception) in self.codes)
+        with self._condition:
+            if sample or dropped:
+                self._limit.update(self._clock() - started, self.inflight,
+                                   dropped)
+            self.inflight -= 1
+            self._condition.notify_all()
+
+    def intercept(self, details, request, proceed):
+        waited = self._acquire(details)
+        if waited:
+            # The time spent in the queue counts against the timeout.
+            details = details._replace(timeout=details.timeout - waited)
+        started = self._clock()
+        try:
+            response = proceed(details, request)
+        except Exception as exception:
+            self._release(started, False, exception)
+            raise
+        except BaseException:
+            self._release(started, False, None)
+            raise
+        if details.future:
+            def _done(response):
+                exception = (None if response.cancelled() else
+                             response.exception())
+                self._release(started, not response.cancelled(), exception)
+            response.add_done_callback(_done)
+        elif details.method.unary_response:
+            self._release(started, True, None)
+        else:
+            # Streaming responses hold their slot until they end, but
+            # their duration is not a latency sample.
+            response = _Released(
+                response,
+                lambda exception: self._release(started, False, exception)
+            )
+        return response
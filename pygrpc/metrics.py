@@ -0,0 +1,284 @@
+import bisect
+import collections
+import threading
+import timeit
+
+from grpc.framework.foundation import future as future_module
+
+# The directions of the messages of an RPC request.
+SENT = 'sent'
+RECEIVED = 'received'
+
+# The upper bounds, in seconds, of the latency histogram buckets: from
+# 1 microsecond to about 2 minutes, doubling each time.
+BUCKETS = tuple(1e-6 * 2 ** i for i in xrange(28))
+
+
+class Recorder(object):
+    """The hook interface of the `metrics` of a `Client` object.
+
+    Subclass it to forward the measurements of every RPC request to
+    another metrics system. The methods are called on the threads that
+    issue and complete the RPC requests, and must be thread-safe.
+    """
+
+    clock = staticmethod(timeit.default_timer)
+
+    def record_call(self, method, overhead, wire, exception):
+        """Called once per RPC request when it completes.
+
+        :type method: str
+        :param method: The qualified name of the RPC method, e.g.
+            `RouteGuide.GetFeature`.
+
+        :type overhead: float
+        :param overhead: The seconds spent in the client before the RPC
+            request was handed to the stub: dispatch and serializer
+            construction.
+
+        :type wire: float
+        :param wire: The seconds from handing the RPC request to the
+            stub until the response, or the last streamed response, was
+            received.
+
+        :type exception: Exception
+        :param exception: The exception raised by the RPC request, or
+            `None`.
+        """
+
+    def record_message(self, method, direction, size):
+        """Called once per request message sent and response message
+        received.
+
+        :type direction: str
+        :param direction: `SENT` or `RECEIVED`.
+
+        :type size: int
+        :param size: The serialized size of the message in bytes.
+        """
+
+
+class Histogram(object):
+    """A latency histogram with fixed exponential buckets."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket of the `q` quantile, or
+        `None` if the histogram is empty.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float('inf')
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': list(self.counts),
+        }
+
+
+class _MethodMetrics(object):
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = collections.Counter()
+        self.overhead = Histogram()
+        self.wire = Histogram()
+        self.messages = {SENT: 0, RECEIVED: 0}
+        self.bytes = {SENT: 0, RECEIVED: 0}
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'errors': dict(self.errors),
+            'overhead': self.overhead.snapshot(),
+            'wire': self.wire.snapshot(),
+            'messages_sent': self.messages[SENT],
+            'messages_received': self.messages[RECEIVED],
+            'bytes_sent': self.bytes[SENT],
+            'bytes_received': self.bytes[RECEIVED],
+        }
+
+
+class Metrics(Recorder):
+    """Aggregate per-method call counts, error counts by exception type,
+    latency histograms and message counts and bytes, and forward every
+    measurement to the `listeners` hooks.
+    """
+
+    def __init__(self, listeners=()):
+        """
+        :type listeners: iterable
+        :param listeners: The `Recorder` objects that receive every
+            measurement.
+        """
+        self.listeners = tuple(listeners)
+        self._lock = threading.Lock()
+        self._methods = collections.defaultdict(_MethodMetrics)
+
+    def record_call(self, method, overhead, wire, exception):
+        with self._lock:
+            metrics = self._methods[method]
+            metrics.calls += 1
+            if exception is not None:
+                metrics.errors[exception.__class__.__name__] += 1
+            metrics.overhead.add(overhead)
+            metrics.wire.add(wire)
+        for listener in self.listeners:
+            listener.record_call(method, overhead, wire, exception)
+
+    def record_message(self, method, direction, size):
+        with self._lock:
+            metrics = self._methods[method]
+            metrics.messages[direction] += 1
+            metrics.bytes[direction] += size
+        for listener in self.listeners:
+            listener.record_message(method, direction, size)
+
+    def snapshot(self):
+        """Return a dictionary mapping each qualified RPC method name,
+        e.g. `RouteGuide.GetFeature`, to a dictionary of its metrics.
+        """
+        with self._lock:
+            return dict((method, metrics.snapshot())
+                        for method, metrics in self._methods.iteritems())
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+
+
+def _size(message):
+    if isinstance(message, bytes):
+        return len(message)
+    return message.ByteSize()
+
+
+class _ObservedCall(object):
+    """The measurements of a single RPC request in flight."""
+    __slots__ = ('recorder', 'method', 'started', 'invoked', 'done')
+
+    def __init__(self, recorder, method, started, invoked):
+        self.recorder = recorder
+        self.method = method
+        self.started = started
+        self.invoked = invoked
+        self.done = False
+
+    def message(self, direction, message):
+        self.recorder.record_message(self.method, direction, _size(message))
+
+    def finish(self, exception=None):
+        if self.done:
+            return
+        self.done = True
+        self.recorder.record_call(self.method, self.invoked - self.started,
+                                  self.recorder.clock() - self.invoked,
+                                  exception)
+
+
+class _ObservedRequests(object):
+    """Count the messages of a request iterator as they are sent."""
+
+    def __init__(self, iterator, call):
+        self._iterator = iter(iterator)
+        self._call = call
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        message = next(self._iterator)
+        self._call.message(SENT, message)
+        return message
+
+    __next__ = next
+
+
+class _ObservedResponses(object):
+    """Count the messages of a streaming response as they are received,
+    and finish the call when the stream ends.
+    """
+
+    def __init__(self, iterator, call):
+        self._iterator = iterator
+        self._call = call
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        try:
+            message = next(self._iterator)
+        except StopIteration:
+            self._call.finish()
+            raise
+        except Exception as exception:
+            self._call.finish(exception)
+            raise
+        self._call.message(RECEIVED, message)
+        return message
+
+    __next__ = next
+
+    def __getattr__(self, attr):
+        return getattr(self._iterator, attr)
+
+
+def observe(recorder, method, started, dispatch, request_or_request_iterator,
+            timeout, future):
+    """Issue the `method` call with `dispatch` and report its
+    measurements to the `recorder` object.
+
+    :type started: float
+    :param started: The `recorder.clock()` time at which the client
+        started handling the RPC request.
+    """
+    call = _ObservedCall(recorder, method.qualified_name, started, None)
+    if method.unary_request:
+        call.message(SENT, request_or_request_iterator)
+    else:
+        request_or_request_iterator = _ObservedRequests(
+            request_or_request_iterator, call
+        )
+    call.invoked = recorder.clock()
+    try:
+        response = dispatch(method, request_or_request_iterator, timeout,
+                            future)
+    except Exception as exception:
+        call.finish(exception)
+        raise
+    if future:
+        def _done(response):
+            if response.cancelled():
+                call.finish(future_module.CancelledError())
+                return
+            exception = response.exception()
+            if exception is None:
+                call.message(RECEIVED, response.result())
+            call.finish(exception)
+        response.add_done_callback(_done)
+    elif method.unary_response:
+        call.message(RECEIVED, response)
+        call.finish()
+    else:
+        response = _ObservedResponses(response, call)
+    return response
@@ -0,0 +1,473 @@
+import importlib
+import itertools
+import random as random_module
+import threading
+import warnings
+
+from .pygrpc import Client, _Index, _channel, _issue
+
+
+class Endpoint(object):
+    """A single channel of a `PooledClient` object and the number of RPC
+    requests that are in flight on it.
+    """
+
+    def __init__(self, host, port, channel):
+        self.host = host
+        self.port = port
+        self.channel = channel
+        self.outstanding = 0
+        # The dispatch index of the channel.
+        self.index = _Index(channel)
+        # The health of the endpoint, and the number of consecutive
+        # failed and successful health probes.
+        self.healthy = True
+        self.failures = 0
+        self.successes = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self.outstanding += 1
+
+    def release(self):
+        with self._lock:
+            self.outstanding -= 1
+
+    def __repr__(self):
+        return '<{!s} {}:{} outstanding={} healthy={}>'.format(
+            self.__class__.__name__, self.host, self.port, self.outstanding,
+            self.healthy
+        )
+
+
+class RoundRobin(object):
+    """Select the endpoints in turn."""
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def select(self, endpoints):
+        return endpoints[next(self._counter) % len(endpoints)]
+
+
+class LeastOutstanding(object):
+    """Select the endpoint with the fewest RPC requests in flight. Ties
+    are broken in round-robin order so that an idle pool does not send
+    every request to the first endpoint.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def select(self, endpoints):
+        size = len(endpoints)
+        offset = next(self._counter)
+        best = None
+        for i in xrange(size):
+            endpoint = endpoints[(offset + i) % size]
+            if best is None or endpoint.outstanding < best.outstanding:
+                best = endpoint
+        return best
+
+
+class PowerOfTwoChoices(object):
+    """Select two endpoints at random and pick the one with the fewer
+    RPC requests in flight, which spreads the load nearly as well as
+    `LeastOutstanding` without scanning every endpoint.
+    """
+
+    def __init__(self, random=None):
+        """
+        :type random: random.Random
+        :param random: The random number generator, or `None` for a new
+            one.
+        """
+        self._random = random_module.Random() if random is None else random
+
+    def select(self, endpoints):
+        size = len(endpoints)
+        if size == 1:
+            return endpoints[0]
+        i = int(self._random.random() * size)
+        j = int(self._random.random() * (size - 1))
+        if j >= i:
+            j += 1
+        first, second = endpoints[i], endpoints[j]
+        return first if first.outstanding <= second.outstanding else second
+
+
+class HealthCheck(object):
+    """Probe the endpoints of a `PooledClient` object periodically and
+    remove the unhealthy ones from the selection.
+    """
+
+    def __init__(self, probe, interval=5.0, timeout=1.0, fall=2, rise=1):
+        """
+        :type probe: callable
+        :param probe: Called as `probe(endpoint, timeout)`; the probe
+            fails if it raises an exception or returns `False`, e.g.
+            `rpc_probe('SayHello', name='health')`.
+
+        :type interval: float
+        :param interval: The number of seconds between two probes.
+
+        :type timeout: float
+        :param timeout: The timeout of a probe in seconds.
+
+        :type fall: int
+        :param fall: The number of consecutive failed probes after which
+            a healthy endpoint becomes unhealthy.
+
+        :type rise: int
+        :param rise: The number of consecutive successful probes after
+            which an unhealthy endpoint becomes healthy.
+        """
+        self.probe = probe
+        self.interval = interval
+        self.timeout = timeout
+        self.fall = fall
+        self.rise = rise
+
+    def check(self, endpoint):
+        """Probe the `endpoint` and update its health."""
+        try:
+            ok = self.probe(endpoint, self.timeout) is not False
+        except Exception:
+            ok = False
+        if ok:
+            endpoint.failures = 0
+            endpoint.successes += 1
+            if endpoint.successes >= self.rise:
+                endpoint.healthy = True
+        else:
+            endpoint.successes = 0
+            endpoint.failures += 1
+            if endpoint.failures >= self.fall:
+                endpoint.healthy = False
+
+
+def rpc_probe(request, **kwargs):
+    """Return a health probe that issues the `request` UNARY_UNARY RPC
+    request, built from the `kwargs` fields, on the probed endpoint.
+    """
+    def probe(endpoint, timeout):
+        method = endpoint.index.resolve(request)
+        if method is None:
+            raise AttributeError('No loaded service defines "{}"!'
+                                 .format(request))
+        method.callable(method.request_class(**kwargs), timeout)
+    return probe
+
+
+def read_addresses(path):
+    """Return the `(host, port)` tuples listed in the file at `path`, one
+    `host:port` per line. Blank lines and `#` comments are ignored.
+    """
+    addresses = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                host, port = line.rsplit(':', 1)
+                addresses.append((host, int(port)))
+    return addresses
+
+
+def _resolver(addresses):
+    """Return a callable that returns the current `(host, port)` tuples
+    of `addresses`.
+    """
+    if callable(addresses):
+        return addresses
+    if isinstance(addresses, basestring):
+        return lambda: read_addresses(addresses)
+    addresses = list(addresses)
+    return lambda: addresses
+
+
+class _TrackedIterator(object):
+    """Wrap a streaming RPC response and release its endpoint once the
+    stream is exhausted, fails, is cancelled or closed, or is garbage
+    collected before its end.
+    """
+
+    def __init__(self, iterator, endpoint):
+        self._iterator = iterator
+        self._endpoint = endpoint
+
+    def _release(self):
+        endpoint, self._endpoint = self._endpoint, None
+        if endpoint is not None:
+            endpoint.release()
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self._release()
+            raise
+
+    __next__ = next
+
+    def cancel(self):
+        self._release()
+        return self._iterator.cancel()
+
+    def close(self):
+        """Cancel the RPC request if it is still in flight and release
+        its endpoint.
+        """
+        if self._endpoint is not None:
+            self._release()
+            cancel = getattr(self._iterator, 'cancel', None)
+            if cancel is not None:
+                cancel()
+
+    def __del__(self):
+        self._release()
+
+    def __getattr__(self, attr):
+        return getattr(self._iterator, attr)
+
+
+class PooledClient(Client):
+    """A client that opens `size` channels to each address and spreads
+    RPC requests across them, so that a single HTTP/2 connection does
+    not become a head-of-line bottleneck.
+
+    The addresses may be re-resolved periodically, and the endpoints
+    probed by a `HealthCheck`; the selection policy only sees the
+    healthy endpoints, or every endpoint if none of them is healthy.
+    """
+
+    def __init__(self, addresses, size=1, policy=None,
+                 channel_credentials=None, refresh=None, health_check=None,
+                 breaker=None, **kwargs):
+        """
+        :type addresses: list
+        :param addresses: The `(host, port)` tuples of the remote hosts
+            to which to connect, a callable that returns them, or the
+            path of a file that lists them (see `read_addresses`).
+
+        :type size: int
+        :param size: The number of channels to open to each address.
+
+        :type policy: object
+        :param policy: The endpoint selection policy, e.g.
+            `RoundRobin()` (default), `LeastOutstanding()` or
+            `PowerOfTwoChoices()`.
+
+        :type refresh: float
+        :param refresh: The number of seconds between two resolutions of
+            a callable or file `addresses`, or `None`.
+
+        :type health_check: HealthCheck
+        :param health_check: The health check of the endpoints, or
+            `None`.
+
+        :type breaker: pygrpc.breaker.CircuitBreaker
+        :param breaker: The circuit breaker that ejects failing
+            endpoints from the selection, or `None`.
+        """
+        self._resolve_addresses = _resolver(addresses)
+        addresses = self._resolve_addresses()
+        if not addresses or size < 1:
+            raise ValueError('At least one channel is required!')
+        host, port = addresses[0]
+        super(PooledClient, self).__init__(
+            host, port, channel_credentials=channel_credentials, **kwargs
+        )
+        self._size = size
+        self._channel_credentials = channel_credentials
+        self._policy = RoundRobin() if policy is None else policy
+        self._health_check = health_check
+        self._breaker = breaker
+        # The `(module, timeouts)` tuples of the loaded modules, which
+        # new endpoints load too.
+        self._modules = []
+        self._endpoints = ()
+        self._healthy = ()
+        self._lock = threading.Lock()
+        # Reuse the channel and the dispatch index of `Client.__init__`.
+        first = Endpoint(host, port, self._channel)
+        first.index = self._index
+        self._update(addresses, first)
+        self._stop = threading.Event()
+        if refresh is not None:
+            self._every(refresh, self.refresh)
+        if health_check is not None:
+            self._every(health_check.interval, self.check_health)
+
+    @property
+    def endpoints(self):
+        return self._endpoints
+
+    def _every(self, interval, fn):
+        """Call `fn` every `interval` seconds on a daemon thread until
+        the client is closed.
+        """
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    fn()
+                except Exception as exception:
+                    warnings.warn('{!r} failed: {!r}'.format(fn, exception),
+                                  RuntimeWarning)
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        """Stop re-resolving the addresses and probing the endpoints."""
+        self._stop.set()
+
+    def _update(self, addresses, first=None):
+        """Publish the endpoints of `addresses`, reusing the endpoints of
+        the addresses that did not change.
+        """
+        with self._lock:
+            current = {}
+            for endpoint in self._endpoints:
+                current.setdefault((endpoint.host, endpoint.port),
+                                   []).append(endpoint)
+            endpoints = []
+            for address in addresses:
+                address = tuple(address)
+                if address in current:
+                    endpoints.extend(current.pop(address))
+                    continue
+                host, port = address
+                for _ in xrange(self._size):
+                    if first is not None:
+                        endpoint, first = first, None
+                    else:
+                        channel = _channel(host, port,
+                                           self._channel_credentials)
+                        endpoint = Endpoint(host, port, channel)
+                        for module, timeouts in self._modules:
+                            endpoint.index.load(module, self.StubRegex,
+                                                timeouts=timeouts)
+                    endpoints.append(endpoint)
+                # Duplicate addresses share their endpoints.
+                current[address] = []
+            # RPC requests in flight on removed endpoints complete on
+            # their channels.
+            self._endpoints = tuple(endpoints)
+            self._select_healthy()
+
+    def _select_healthy(self):
+        endpoints = self._endpoints
+        self._healthy = (tuple(e for e in endpoints if e.healthy) or
+                         endpoints)
+
+    def refresh(self):
+        """Resolve the addresses again and connect to the new ones. An
+        empty resolution keeps the current endpoints.
+        """
+        addresses = self._resolve_addresses()
+        if addresses:
+            self._update(addresses)
+
+    def check_health(self):
+        """Probe every endpoint once and update the selection."""
+        for endpoint in self._endpoints:
+            self._health_check.check(endpoint)
+        with self._lock:
+            self._select_healthy()
+
+    def load(self, name, package=None, timeouts=None):
+        """Load the Google Protocol Buffer module and register the
+        associated stub factories on every channel of the pool.
+        """
+        module = importlib.import_module(name, package=package)
+        # Hold the lock throughout, so that the endpoints that a
+        # concurrent `refresh` creates load the module too.
+        with self._lock:
+            self._modules.append((module, timeouts))
+            for endpoint in self._endpoints:
+                if endpoint.index is not self._index:
+                    endpoint.index.load(module, self.StubRegex,
+                                        timeouts=timeouts)
+            # RPC requests resolve their method on the dispatch index of
+            # the client, therefore, register the module there last,
+            # once every channel can issue its RPC methods.
+            super(PooledClient, self).load(name, package=package,
+                                           timeouts=timeouts)
+
+    def unload(self, name, package=None):
+        with self._lock:
+            # Unregister the module from the dispatch index of the client
+            # first, so that no new RPC request resolves its methods.
+            super(PooledClient, self).unload(name, package=package)
+            module = importlib.import_module(name, package=package)
+            self._modules = [(m, timeouts) for m, timeouts in self._modules
+                             if m.__name__ != module.__name__]
+            for endpoint in self._endpoints:
+                if endpoint.index is not self._index:
+                    endpoint.index.unload(module.__name__)
+
+    def _select(self):
+        """Return the endpoint of the next RPC request and its admitted
+        circuit, or `None` without a breaker.
+        """
+        breaker = self._breaker
+        if breaker is None:
+            return self._policy.select(self._healthy), None
+        candidates = self._healthy
+        while True:
+            # Eject the endpoints whose circuit is open.
+            available = tuple(e for e in candidates
+                              if breaker.circuit(e).available())
+            if not available:
+                raise breaker.reject('every endpoint')
+            endpoint = self._policy.select(available)
+            circuit = breaker.circuit(endpoint)
+            if circuit.allow():
+                return endpoint, circuit
+            # The half-open circuit has admitted its trial calls.
+            candidates = tuple(e for e in available if e is not endpoint)
+
+    def _invoke(self, method, request_or_request_iterator, timeout,
+                future=False, options=None):
+        endpoint, circuit = self._select()
+        if circuit is None:
+            return self._invoke_on(endpoint, method,
+                                   request_or_request_iterator, timeout,
+                                   future, options)
+        return self._breaker.guard(
+            circuit,
+            lambda: self._invoke_on(endpoint, method,
+                                    request_or_request_iterator, timeout,
+                                    future, options),
+            future, method.unary_response
+        )
+
+    def _invoke_on(self, endpoint, method, request_or_request_iterator,
+                   timeout, future, options=None):
+        resolved = endpoint.index.resolve(method.qualified_name)
+        if resolved is None:
+            raise AttributeError('RPC method "{}" is not loaded on the '
+                                 'channel to {}:{}!'
+                                 .format(method.qualified_name,
+                                         endpoint.host, endpoint.port))
+        multi_callable = resolved.variant(method.encoding).callable
+        endpoint.acquire()
+        try:
+            response = _issue(multi_callable, request_or_request_iterator,
+                              timeout, future, options)
+        except BaseException:
+            endpoint.release()
+            raise
+        if future:
+            response.add_done_callback(lambda _: endpoint.release())
+        elif method.unary_response:
+            endpoint.release()
+        else:
+            # The RPC request stays in flight until the streaming
+            # response is consumed.
+            response = _TrackedIterator(response, endpoint)
+        return response
@@ -1,100 +1,833 @@
 import importlib
 import re
+import threading
+import warnings
 
 from grpc.beta import implementations
 from grpc.framework.common.cardinality import Cardinality
 
+from . import aio
+from . import batch
+from . import deadlines
+from . import interceptors as interceptors_module
+from . import metrics as metrics_module
+
+
+# The encodings of the RPC requests and responses of a `_Method` object.
+# `MESSAGE` sends and receives serializer class objects; `PASSTHROUGH`
+# also accepts pre-serialized `bytes` requests; `RAW` accepts `bytes`
+# requests and returns the `bytes` payloads of the responses without
+# deserializing them.
+MESSAGE = 'message'
+PASSTHROUGH = 'passthrough'
+RAW = 'raw'
+
+
+def _serialize(message):
+    """Serialize the request `message`, passing pre-serialized `bytes`
+    payloads through unchanged.
+    """
+    if isinstance(message, bytes):
+        return message
+    return message.SerializeToString()
+
+
+def _identity(payload):
+    return payload
+
+
+class _Service(object):
+    """A service defined in a Google Protocol Buffer module, and the
+    serializers that its stub objects are created with.
+    """
+
+    def __init__(self, stub, channel):
+        self.group = stub._delegate._group
+        self.stub = stub
+        self.channel = channel
+        self.cardinalities = stub._delegate._cardinalities
+        kernel = stub._up.im_self._grpc_link._kernel
+        # Return dictionaries of serializer classes.
+        self.request_serializers = kernel._request_serializers
+        self.response_deserializers = kernel._response_deserializers
+        self._stubs = {MESSAGE: stub}
+
+    def stub_for(self, encoding):
+        """Return the stub object of the service for the `encoding`.
+
+        The stub objects of encodings other than `MESSAGE` are created
+        the first time they are used. Concurrent first uses may create
+        the stub object twice, which is harmless.
+        """
+        try:
+            return self._stubs[encoding]
+        except KeyError:
+            pass
+        request_serializers = dict.fromkeys(self.request_serializers,
+                                            _serialize)
+        if encoding == RAW:
+            response_deserializers = dict.fromkeys(
+                self.response_deserializers, _identity
+            )
+        else:
+            response_deserializers = self.response_deserializers
+        options = implementations.stub_options(
+            request_serializers=request_serializers,
+            response_deserializers=response_deserializers
+        )
+        stub = implementations.dynamic_stub(self.channel, self.group,
+                                            self.cardinalities,
+                                            options=options)
+        self._stubs[encoding] = stub
+        return stub
+
+
+class _Method(object):
+    """The dispatch metadata of a single RPC method, resolved once when
+    the stub that owns it is indexed.
+    """
+    __slots__ = ('name', 'qualified_name', 'group', 'service', 'stub',
+                 'callable', 'cardinality', 'request_class', 'unary_request',
+                 'unary_response', 'encoding', 'timeout', '_variants')
+
+    def __init__(self, name, qualified_name, service, cardinality,
+                 request_class, encoding=MESSAGE, timeout=None):
+        self.name = name
+        # The name that selects the service of the RPC method, e.g.
+        # `RouteGuide.GetFeature`. Unlike `name`, it is unique across
+        # the loaded services.
+        self.qualified_name = qualified_name
+        self.group = service.group
+        self.service = service
+        self.stub = service.stub_for(encoding)
+        # The bound multi-callable object, e.g. `stub.GetFeature`.
+        self.callable = getattr(self.stub, name)
+        self.cardinality = cardinality
+        # The serializer class definition that is to be instantiated
+        # when issuing the RPC request.
+        self.request_class = request_class
+        self.unary_request = cardinality in (Cardinality.UNARY_UNARY,
+                                             Cardinality.UNARY_STREAM)
+        self.unary_response = cardinality in (Cardinality.UNARY_UNARY,
+                                              Cardinality.STREAM_UNARY)
+        self.encoding = encoding
+        # The default timeout of the RPC method, or `None` to use the
+        # client default.
+        self.timeout = timeout
+        self._variants = {encoding: self}
+
+    def variant(self, encoding):
+        """Return the `_Method` object of the same RPC method for the
+        `encoding`.
+        """
+        try:
+            return self._variants[encoding]
+        except KeyError:
+            method = _Method(self.name, self.qualified_name, self.service,
+                             self.cardinality, self.request_class,
+                             encoding=encoding, timeout=self.timeout)
+            method._variants = self._variants
+            self._variants[encoding] = method
+            return method
+
+    def __repr__(self):
+        return '<{!s} {}.{}>'.format(self.__class__.__name__, self.group,
+                                     self.name)
+
+
+class _Factory(object):
+    """A stub factory of a service, e.g. `beta_create_RouteGuide_stub`,
+    and the `_Service` object that it creates the first time it is used.
+    """
+
+    def __init__(self, name, channel, fn=None, stub=None, methods=None,
+                 module=None, timeouts=None):
+        # The name of the service, e.g. `RouteGuide`.
+        self.name = name
+        self.channel = channel
+        self._fn = fn
+        # The names of the RPC methods of the service, known without
+        # creating the stub object.
+        self.methods = methods
+        # The name of the module that defines the service, or `None`.
+        self.module = module
+        # A dictionary mapping method names, qualified method names and
+        # service names to default timeouts.
+        self.timeouts = timeouts or {}
+        self._service = None
+        self._lock = threading.Lock()
+        if stub is not None:
+            self._set(_Service(stub, channel))
+
+    @property
+    def built(self):
+        return self._service is not None
+
+    def _set(self, service):
+        if self.methods is None:
+            self.methods = frozenset(service.cardinalities)
+        self._service = service
+
+    def service(self):
+        """Return the `_Service` object, creating the stub object on the
+        first call.
+        """
+        service = self._service
+        if service is None:
+            with self._lock:
+                if self._service is None:
+                    stub = self._fn(self.channel)
+                    self._set(_Service(stub, self.channel))
+                service = self._service
+        return service
+
+    def qualify(self, name):
+        """Return the qualified name of the `name` RPC method, e.g.
+        `RouteGuide.GetFeature`.
+        """
+        return '{}.{}'.format(self.name, name)
+
+    def timeout(self, name):
+        """Return the default timeout of the `name` RPC method, or
+        `None`. A qualified method name takes precedence over a method
+        name, which takes precedence over the service name.
+        """
+        for key in (self.qualify(name), name, self.name):
+            try:
+                return self.timeouts[key]
+            except KeyError:
+                pass
+        return None
+
+
+def _methods_of(module, name):
+    """Return the names of the RPC methods of the `name` service of the
+    `module` object, read from the abstract `Beta*Stub` interface that
+    the Google Protocol Buffer compiler generates alongside its stub
+    factory, or `None` if there is no such interface.
+    """
+    interface = getattr(module, 'Beta{}Stub'.format(name), None)
+    return getattr(interface, '__abstractmethods__', None)
+
+
+def _service_name(fn):
+    """Return the name of the service of the `fn` stub factory, e.g.
+    `RouteGuide` for `beta_create_RouteGuide_stub`.
+    """
+    prefix, suffix = 'beta_create_', '_stub'
+    if fn.startswith(prefix) and fn.endswith(suffix):
+        return fn[len(prefix):-len(suffix)]
+    return fn
+
+
+class _Snapshot(object):
+    """The state of a dispatch index. A snapshot is never modified once
+    it is published, therefore, it can be read without a lock.
+    """
+    __slots__ = ('factories', 'methods', 'owners', 'collisions')
+
+    def __init__(self, factories=(), methods=None, owners=None,
+                 collisions=None):
+        # The `_Factory` objects of the registered services, in order.
+        self.factories = tuple(factories)
+        # A dictionary of the resolved `_Method` objects.
+        self.methods = {} if methods is None else methods
+        # A dictionary mapping each RPC method name and qualified name
+        # to the `_Factory` object of the service that owns it.
+        self.owners = {} if owners is None else owners
+        # A dictionary mapping each colliding name to the qualified
+        # names of the RPC methods that define it, first one first.
+        self.collisions = {} if collisions is None else collisions
+
+
+class _Index(object):
+    """The dispatch index of a channel, mapping each RPC method name to
+    its `_Method` object.
+
+    Every RPC method is indexed by its name, e.g. `GetFeature`, and by
+    its qualified name, e.g. `RouteGuide.GetFeature`. If more than one
+    service defines the same method name, the first service loaded wins
+    and the collision is recorded in `collisions`.
+
+    Stub objects are created lazily: loading a module only registers its
+    stub factories, and the stub object of a service is created the
+    first time one of its RPC methods is resolved.
+
+    The state of the index is an immutable `_Snapshot` object. Every
+    change (loading, unloading, replacing the stubs and the first
+    resolution of a service) builds a new snapshot while holding the
+    lock, and publishes it with a single attribute assignment, so that
+    readers never take the lock and always see a consistent snapshot.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.snapshot = _Snapshot()
+        self._lock = threading.Lock()
+
+    @property
+    def factories(self):
+        return self.snapshot.factories
+
+    @property
+    def methods(self):
+        return self.snapshot.methods
+
+    @property
+    def collisions(self):
+        return self.snapshot.collisions
+
+    def load(self, module, regex, timeouts=None):
+        """Register the stub factories of the `module` object whose names
+        match the `regex` regular expression, and return the names that
+        collide with the RPC methods of earlier services.
+        """
+        prog = re.compile(regex)
+        with self._lock:
+            factories = self.snapshot.factories
+            if any(factory.module == module.__name__
+                   for factory in factories):
+                # The module is already loaded.
+                return []
+            added = []
+            for attr in module.__dict__.iterkeys():
+                match = prog.match(attr)
+                if match:
+                    fn = match.group(0)
+                    name = _service_name(fn)
+                    added.append(_Factory(name, self.channel,
+                                          fn=getattr(module, fn),
+                                          methods=_methods_of(module, name),
+                                          module=module.__name__,
+                                          timeouts=timeouts))
+            return self._publish(factories + tuple(added), added)
+
+    def unload(self, module):
+        """Remove the services of the `module` module name and return
+        `True`, or `False` if none of its services is registered.
+        """
+        with self._lock:
+            factories = self.snapshot.factories
+            kept = tuple(factory for factory in factories
+                         if factory.module != module)
+            if len(kept) == len(factories):
+                return False
+            self._publish(kept)
+            return True
+
+    def reset(self, stubs=()):
+        """Remove every registered service, and register the `stubs`
+        objects instead.
+        """
+        added = []
+        for stub in stubs:
+            name = stub._delegate._group.rsplit('.', 1)[-1]
+            added.append(_Factory(name, self.channel, stub=stub))
+        with self._lock:
+            self._publish(tuple(added), added)
+
+    def _publish(self, factories, added=()):
+        """Build and publish the snapshot of the `factories`, and return
+        the names that the `added` factories collide on. The caller must
+        hold the lock.
+        """
+        previous = self.snapshot
+        owners = {}
+        collisions = {}
+        colliding = []
+        for factory in factories:
+            if factory.methods is None:
+                # The RPC methods are unknown until the stub object is
+                # created, therefore, create it now.
+                factory.service()
+            for name in factory.methods:
+                qualified = factory.qualify(name)
+                for key in (name, qualified):
+                    owner = owners.setdefault(key, factory)
+                    if owner is not factory:
+                        collisions.setdefault(
+                            key, [owner.qualify(name)]
+                        ).append(qualified)
+                        if factory in added:
+                            colliding.append(key)
+        # Keep the resolved methods whose owner did not change.
+        methods = dict((key, method)
+                       for key, method in previous.methods.iteritems()
+                       if owners.get(key) is previous.owners.get(key))
+        for factory in factories:
+            if factory.built:
+                self._add(factory, methods, owners)
+        self.snapshot = _Snapshot(factories, methods, owners, collisions)
+        return colliding
+
+    def _add(self, factory, methods, owners):
+        """Add the RPC methods that the service of the `factory` object
+        owns to the `methods` dictionary.
+        """
+        service = factory.service()
+        for name, cardinality in service.cardinalities.iteritems():
+            method = None
+            for key in (name, factory.qualify(name)):
+                if key in methods or owners.get(key) is not factory:
+                    continue
+                if method is None:
+                    serializer = service.request_serializers[
+                        (service.group, name)
+                    ]
+                    method = _Method(name, factory.qualify(name), service,
+                                     cardinality, serializer.im_class,
+                                     timeout=factory.timeout(name))
+                methods[key] = method
+
+    def resolve(self, name):
+        """Return the `_Method` object of the `name` RPC method, or
+        `None` if no loaded service defines it.
+        """
+        snapshot = self.snapshot
+        try:
+            return snapshot.methods[name]
+        except KeyError:
+            pass
+        if name not in snapshot.owners:
+            return None
+        with self._lock:
+            # Another thread may have changed the snapshot meanwhile.
+            snapshot = self.snapshot
+            factory = snapshot.owners.get(name)
+            if factory is not None and name not in snapshot.methods:
+                methods = dict(snapshot.methods)
+                self._add(factory, methods, snapshot.owners)
+                self.snapshot = _Snapshot(snapshot.factories, methods,
+                                          snapshot.owners,
+                                          snapshot.collisions)
+            return self.snapshot.methods.get(name)
+
+    def stubs(self):
+        """Return the stub objects of every registered service, creating
+        the ones that have not been used yet.
+        """
+        with self._lock:
+            snapshot = self.snapshot
+            if not all(factory.built for factory in snapshot.factories):
+                methods = dict(snapshot.methods)
+                for factory in snapshot.factories:
+                    self._add(factory, methods, snapshot.owners)
+                self.snapshot = snapshot = _Snapshot(
+                    snapshot.factories, methods, snapshot.owners,
+                    snapshot.collisions
+                )
+        return [factory.service().stub for factory in snapshot.factories]
+
+
+def _channel(host, port, channel_credentials=None):
+    """Return a new channel object to the remote host."""
+    if channel_credentials is None:
+        # Create an `insecure_channel`.
+        return implementations.insecure_channel(host, port)
+    # Create a `secure_channel`.
+    return implementations.secure_channel(host, port, channel_credentials)
+
+
+def _issue(multi_callable, request_or_request_iterator, timeout, future,
+           options=None):
+    """Call `multi_callable`, or its future variant if `future` is
+    `True`, passing the `options` protocol options only if given.
+    """
+    if future:
+        multi_callable = multi_callable.future
+    if options is None:
+        return multi_callable(request_or_request_iterator, timeout)
+    return multi_callable(request_or_request_iterator, timeout,
+                          protocol_options=options)
+
 
 class Client(object):
     DefaultTimeout = 10
     StubRegex = r'^beta_create_.*_stub$'
 
-    def __init__(self, host, port, channel_credentials=None):
+    def __init__(self, host, port, channel_credentials=None, raw=False,
+                 cache=None, coalescer=None, metrics=None, interceptors=(),
+                 compression=None):
         """
         :type host: str
         :param host: The name of the remote host to which to connect.
 
         :type port: int
         :param port: The port of the remote host to which to connect.
+
+        :type raw: bool
+        :param raw: Return the `bytes` payloads of the RPC responses
+            without deserializing them. Can be overridden per RPC
+            request with the `raw` keyword argument.
+
+        :type cache: pygrpc.cache.ResponseCache
+        :param cache: The cache of the responses of idempotent
+            UNARY_UNARY methods, or `None`.
+
+        :type coalescer: pygrpc.coalesce.Coalescer
+        :param coalescer: Share a single RPC request between concurrent
+            identical requests of idempotent UNARY_UNARY methods, or
+            `None`.
+
+        :type metrics: pygrpc.metrics.Recorder
+        :param metrics: The recorder of the latency, errors and messages
+            of every RPC request, e.g. `pygrpc.metrics.Metrics()`, or
+            `None`.
+
+        :type interceptors: list
+        :param interceptors: The `pygrpc.interceptors.Interceptor`
+            objects that every RPC request passes through, first one
+            first.
+
+        :type compression: pygrpc.compression.Compression
+        :param compression: The settings that allow or disable the
+            compression of the RPC requests per method, or `None` to
+            leave it to the channel.
         """
-        if channel_credentials is None:
-            # Create an `insecure_channel`.
-            channel = implementations.insecure_channel(host, port)
+        self._channel = _channel(host, port, channel_credentials)
+        self._raw = raw
+        self._cache = cache
+        self._coalescer = coalescer
+        self._metrics = metrics
+        self._compression = compression
+        self.interceptors = interceptors
+        self._index = _Index(self._channel)
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @cache.setter
+    def cache(self, value):
+        self._cache = value
+
+    @property
+    def coalescer(self):
+        return self._coalescer
+
+    @coalescer.setter
+    def coalescer(self, value):
+        self._coalescer = value
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, value):
+        self._metrics = value
+
+    @property
+    def compression(self):
+        return self._compression
+
+    @compression.setter
+    def compression(self, value):
+        self._compression = value
+
+    @property
+    def interceptors(self):
+        return self._interceptors
+
+    @interceptors.setter
+    def interceptors(self, value):
+        self._interceptors = tuple(value)
+        if self._interceptors:
+            self._chain = interceptors_module.chain(self._interceptors,
+                                                    self._terminal)
         else:
-            # Create a `secure_channel`.
-            channel = implementations.secure_channel(host, port,
-                                                     channel_credentials)
-        self._channel = channel
-        self._stubs = []
+            self._chain = None
 
     @property
     def stubs(self):
-        return self._stubs
+        return self._index.stubs()
 
     @stubs.setter
     def stubs(self, value):
-        self._stubs = value
+        self._index.reset(value)
 
-    def load(self, name, package=None):
-        """Load the Google Protocol Buffer module and generate the
-        associated stub objects.
+    @property
+    def collisions(self):
+        """A dictionary mapping each RPC method name that more than one
+        loaded service defines to their qualified names. The name
+        resolves to the first one; use the qualified names, e.g.
+        `client.request('RouteGuide.GetFeature')`, to select a service.
         """
+        return self._index.collisions
+
+    def load(self, name, package=None, timeouts=None):
+        """Load the Google Protocol Buffer module and register the
+        associated stub factories alongside the ones of the modules
+        loaded before. The stub object of a service is generated the
+        first time one of its RPC methods is requested.
+
+        :type timeouts: dict
+        :param timeouts: A dictionary mapping method names (e.g.
+            `GetFeature`), qualified method names (e.g.
+            `RouteGuide.GetFeature`) or service names (e.g.
+            `RouteGuide`) of the module to their default timeouts in
+            seconds. Other RPC methods default to `DefaultTimeout`.
+        """
+        module = importlib.import_module(name, package=package)
+        # Build the dispatch index once so that `request` does not
+        # need to scan every stub on each call.
+        for key in self._index.load(module, self.StubRegex,
+                                    timeouts=timeouts):
+            warnings.warn('RPC method "{}" is defined by {}; it resolves '
+                          'to the first one.'
+                          .format(key, ', '.join(self.collisions[key])),
+                          RuntimeWarning)
+
+    def unload(self, name, package=None):
+        """Remove the services of the Google Protocol Buffer module."""
         module = importlib.import_module(name, package=package)
-        stubs = []
-        prog = re.compile(self.StubRegex)
-        for attr in module.__dict__.iterkeys():
-            match = prog.match(attr)
-            if match:
-                fn = match.group(0)
-                # Instantiate `_AutoIntermediary` object and append it
-                # to the `stubs` list object.
-                stub = getattr(module, fn)(self._channel)
-                stubs.append(stub)
-        self._stubs = stubs
+        if not self._index.unload(module.__name__):
+            raise ValueError('Module "{}" is not loaded!'
+                             .format(module.__name__))
+
+    def _resolve(self, request):
+        """Return the `_Method` object of the `request` RPC method."""
+        try:
+            return self._index.snapshot.methods[request]
+        except KeyError:
+            # The stub object of the service may not have been created
+            # yet.
+            method = self._index.resolve(request)
+        if method is None:
+            # The RPC request does not exist in the protocol definition
+            # file, therefore, raise an `AttributeError`.
+            raise AttributeError('{} object has no attribute "{}"!'
+                                 .format(self.__class__.__name__, request))
+        return method
+
+    def _prepare(self, method, args, kwargs):
+        """Return the `_Method` object to call, and the
+        `request_or_request_iterator` and `timeout` arguments of the
+        call.
+        """
+        # Override the default `timeout` value if specified when
+        # issuing the RPC request.
+        timeout = kwargs.pop('timeout', None)
+        if timeout is None:
+            timeout = method.timeout
+            if timeout is None:
+                timeout = self.DefaultTimeout
+        # Within a `deadlines.deadline` block, the RPC request gets at
+        # most the time remaining until the deadline.
+        remaining = deadlines.remaining()
+        if remaining is not None and remaining < timeout:
+            timeout = remaining
+        if timeout <= 0:
+            # Fail fast rather than send an RPC request that is already
+            # late.
+            raise deadlines.expired(method.name)
+        if kwargs.pop('raw', self._raw):
+            method = method.variant(RAW)
+        # The `request_or_request_iterator` object determines the type
+        # of argument to pass to the object call. It can either be a
+        # generator object or the initialized serializer class object.
+        if not method.unary_request:
+            request_or_request_iterator = args[0]
+        elif args:
+            # A prebuilt serializer class object or a pre-serialized
+            # `bytes` payload is passed straight through.
+            request_or_request_iterator = args[0]
+            if (isinstance(request_or_request_iterator, bytes) and
+                    method.encoding == MESSAGE):
+                method = method.variant(PASSTHROUGH)
+        else:
+            request_or_request_iterator = method.request_class(**kwargs)
+        return method, request_or_request_iterator, timeout
+
+    def _invoke(self, method, request_or_request_iterator, timeout,
+                future=False, options=None):
+        """Issue the `method` call, using its future variant if `future`
+        is `True`, with the `options` protocol options if any.
+        """
+        return _issue(method.callable, request_or_request_iterator, timeout,
+                      future, options)
 
     def request(self, request, *args, **kwargs):
         """An abstract method for issuing RPC requests."""
-        if not self._stubs:
-            # `_stubs` object is an empty list, therefore, return
-            # `None`.
+        if not self._index.snapshot.factories:
+            # No module has been loaded, therefore, return `None`.
             return None
-        for stub in self._stubs:
-            group = stub._delegate._group
-            # Return a dictionary of serializer classes.
-            request_serializers = (
-                stub._up.im_self._grpc_link._kernel._request_serializers
-            )
-            # The request serializer key.
-            key = (stub._delegate._group, request)
-            try:
-                # Override the default `timeout` value if specified when
-                # issuing the RPC request.
-                timeout = kwargs.pop('timeout', self.DefaultTimeout)
-                # The `request_or_request_iterator` object determines
-                # the type of argument to pass to the object call. It
-                # can either be a generator object or the initialized
-                # serializer class object.
-                cardinality = stub._delegate._cardinalities[request]
-                if cardinality.name in (Cardinality.UNARY_UNARY.name,
-                                        Cardinality.UNARY_STREAM.name):
-                    serializer = request_serializers[key]
-                    # The serializer class definition that is to be
-                    # instantiated when issuing the RPC request.
-                    serializer = serializer.im_class
-                    request_or_request_iterator = serializer(**kwargs)
-                elif cardinality.name in (Cardinality.STREAM_UNARY.name,
-                                          Cardinality.STREAM_STREAM.name):
-                    request_or_request_iterator = args[0]
-                obj = getattr(stub, request)
-                response = obj.__call__(request_or_request_iterator, timeout)
+        metrics = self._metrics
+        started = None if metrics is None else metrics.clock()
+        method = self._resolve(request)
+        method, request_or_request_iterator, timeout = self._prepare(
+            method, args, kwargs
+        )
+        return self._submit(method, request_or_request_iterator, timeout,
+                            started=started)
+
+    def _submit(self, method, request_or_request_iterator, timeout,
+                future=False, started=None):
+        """Pass the `method` call through the interceptors, if any."""
+        if self._chain is None:
+            return self._call(method, request_or_request_iterator, timeout,
+                              future, started)
+        details = interceptors_module.CallDetails(
+            method.name, method.cardinality, timeout, future, method, started
+        )
+        return self._chain(details, request_or_request_iterator)
+
+    def _terminal(self, details, request_or_request_iterator):
+        """The last link of the interceptor chain."""
+        return self._call(details.method, request_or_request_iterator,
+                          details.timeout, details.future, details.started)
+
+    def _call(self, method, request_or_request_iterator, timeout,
+              future=False, started=None):
+        """Issue the `method` call, reporting it to the metrics recorder
+        if one is set.
+        """
+        metrics = self._metrics
+        if metrics is None:
+            return self._dispatch(method, request_or_request_iterator,
+                                  timeout, future)
+        if started is None:
+            started = metrics.clock()
+        return metrics_module.observe(metrics, method, started,
+                                      self._dispatch,
+                                      request_or_request_iterator, timeout,
+                                      future)
+
+    def _dispatch(self, method, request_or_request_iterator, timeout,
+                  future=False):
+        """Issue the `method` call through the response cache and the
+        coalescer if they apply to it, with the compression settings of
+        the method if any.
+        """
+        if not future and method.cardinality is Cardinality.UNARY_UNARY and (
+                (self._cache is not None and
+                 interceptors_module.selects(self._cache.methods, method)) or
+                (self._coalescer is not None and
+                 interceptors_module.selects(self._coalescer.methods,
+                                             method))):
+            return self._request_shared(method, request_or_request_iterator,
+                                        timeout)
+        request_or_request_iterator, options = self._compress(
+            method, request_or_request_iterator
+        )
+        return self._invoke(method, request_or_request_iterator, timeout,
+                            future=future, options=options)
+
+    def _compress(self, method, request_or_request_iterator):
+        """Return the request argument and the protocol options of an
+        RPC request of the `method` that is about to be issued.
+
+        Only the RPC requests actually issued count in the compression
+        stats, not the calls served by the response cache or the
+        coalescer.
+        """
+        compression = self._compression
+        if compression is None:
+            return request_or_request_iterator, None
+        return compression.prepare(method, request_or_request_iterator)
+
+    def _request_shared(self, method, request, timeout):
+        """Issue the `method` call through the response cache and the
+        coalescer, either of which may serve the response without
+        issuing a new RPC request.
+        """
+        # The serialized request is both the key and the payload that
+        # is sent if the RPC request is issued.
+        payload = _serialize(request)
+        # The qualified name keeps apart the services that define the
+        # same method name.
+        key = (method.qualified_name, payload)
+        cache = self._cache
+        if cache is not None and not interceptors_module.selects(
+                cache.methods, method):
+            cache = None
+        coalescer = self._coalescer
+        if coalescer is not None and not interceptors_module.selects(
+                coalescer.methods, method):
+            coalescer = None
+        response = None if cache is None else cache.get(key)
+        if response is None:
+            def fetch():
+                raw = method.variant(RAW)
+                request, options = self._compress(raw, payload)
+                response = self._invoke(raw, request, timeout,
+                                        options=options)
+                if cache is not None:
+                    cache.put(key, response)
                 return response
-            except (AttributeError, KeyError):
-                continue
-        else:
-            # The RPC request does not exist in the protocol definition
-            # file, therefore, raise an `AttributeError`.
-            raise AttributeError('{} object has no attribute "{}"!'
-                                 .format(group, request))
+            if coalescer is None:
+                response = fetch()
+            else:
+                response = coalescer.do(key, fetch)
+        if method.encoding == RAW:
+            return response
+        # Every caller receives its own deserialized response.
+        deserializer = method.service.response_deserializers[
+            (method.group, method.name)
+        ]
+        return deserializer(response)
+
+    def request_async(self, request, *args, **kwargs):
+        """Issue the RPC request without blocking and return a future
+        object of the response.
+
+        Only RPC methods with a unary response (UNARY_UNARY and
+        STREAM_UNARY) can be issued asynchronously.
+        """
+        if not self._index.snapshot.factories:
+            return None
+        metrics = self._metrics
+        started = None if metrics is None else metrics.clock()
+        method = self._resolve(request)
+        if not method.unary_response:
+            raise AttributeError('"{}" RPC method has no future variant!'
+                                 .format(request))
+        method, request_or_request_iterator, timeout = self._prepare(
+            method, args, kwargs
+        )
+        return self._submit(method, request_or_request_iterator, timeout,
+                            future=True, started=started)
+
+    def request_many(self, request, requests, concurrency=8, ordered=True,
+                     timeout=None):
+        """Issue the RPC request once for each item of `requests` and
+        yield a `batch.Result` object per item. A failed item is
+        reported in its `Result.exception` attribute instead of
+        aborting the batch.
+
+        :type requests: iterable
+        :param requests: The keyword argument dictionaries or the
+            serializer class objects of the RPC requests.
+
+        :type concurrency: int
+        :param concurrency: The maximum number of RPC requests in
+            flight.
+
+        :type ordered: bool
+        :param ordered: Yield the results in input order if `True`,
+            otherwise in completion order.
+        """
+        if not self._index.snapshot.factories:
+            return None
+        if concurrency < 1:
+            raise ValueError('`concurrency` must be at least 1!')
+        # Resolve the dispatch once for the whole batch.
+        method = self._resolve(request)
+        if not method.unary_response:
+            raise AttributeError('"{}" RPC method has no future variant!'
+                                 .format(request))
+        return batch.request_many(self, method, requests, concurrency,
+                                  ordered, timeout)
+
+    def call(self, request, *args, **kwargs):
+        """Issue the RPC request and return an `asyncio` future object
+        that can be awaited from an event loop, e.g.
+        `await client.call('GetFeature', latitude=1, longitude=2)`.
+        """
+        future = self.request_async(request, *args, **kwargs)
+        if future is None:
+            return None
+        return aio.wrap_future(future)
 
     def __str__(self):
         return '<{!s}>'.format(self.__class__.__name__)
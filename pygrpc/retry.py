@@ -0,0 +1,285 @@
+import random
+import threading
+import time
+
+from grpc.beta.interfaces import StatusCode
+from grpc.framework.interfaces.face import face
+
+from .interceptors import Interceptor, lookup
+
+# The status codes of the abortion errors that are raised without one.
+_CODES = (
+    (face.ExpirationError, StatusCode.DEADLINE_EXCEEDED),
+    (face.NetworkError, StatusCode.UNAVAILABLE),
+    (face.RemoteShutdownError, StatusCode.UNAVAILABLE),
+)
+
+
+def status_code(exception):
+    """Return the `grpc.beta.interfaces.StatusCode` of an abortion error,
+    or `None`.
+    """
+    code = getattr(exception, 'code', None)
+    if isinstance(code, StatusCode):
+        return code
+    for cls, code in _CODES:
+        if isinstance(exception, cls):
+            return code
+    return None
+
+
+class RetryPolicy(object):
+    """How to retry the failed RPC requests of a method."""
+
+    def __init__(self, max_attempts=3, initial_backoff=0.1, max_backoff=5.0,
+                 multiplier=2.0, attempt_timeout=None,
+                 codes=(StatusCode.UNAVAILABLE,
+                        StatusCode.DEADLINE_EXCEEDED)):
+        """
+        :type max_attempts: int
+        :param max_attempts: The maximum number of attempts, including
+            the first one.
+
+        :type initial_backoff: float
+        :param initial_backoff: The upper bound, in seconds, of the delay
+            before the first retry. Each retry waits a random delay
+            between zero and the bound ("full jitter").
+
+        :type max_backoff: float
+        :param max_backoff: The maximum upper bound of the delay.
+
+        :type multiplier: float
+        :param multiplier: The growth of the upper bound per retry.
+
+        :type attempt_timeout: float
+        :param attempt_timeout: The timeout of each attempt in seconds,
+            or `None`. The timeout of the RPC request always bounds all
+            of the attempts together, so that `DEADLINE_EXCEEDED` is only
+            worth retrying with an attempt timeout.
+
+        :type codes: iterable
+        :param codes: The retryable `grpc.beta.interfaces.StatusCode`
+            values.
+        """
+        if max_attempts < 1:
+            raise ValueError('At least one attempt is required!')
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.attempt_timeout = attempt_timeout
+        self.codes = frozenset(codes)
+
+    def backoff(self, retry, random=random.random):
+        """Return the delay in seconds before the `retry`-th retry."""
+        bound = self.initial_backoff * self.multiplier ** (retry - 1)
+        return random() * min(bound, self.max_backoff)
+
+
+class RetryBudget(object):
+    """A token bucket that caps the retries at a fraction of the RPC
+    requests, so that retries cannot turn an outage into a retry storm.
+
+    Each RPC request deposits `ratio` tokens and each retry withdraws a
+    whole token. The bucket starts full.
+    """
+
+    def __init__(self, ratio=0.1, max_tokens=10):
+        """
+        :type ratio: float
+        :param ratio: The number of retries allowed per RPC request.
+
+        :type max_tokens: float
+        :param max_tokens: The capacity of the bucket, i.e. the largest
+            burst of retries.
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+        # The number of retries allowed, and denied by the budget.
+        self.retries = 0
+        self.exhausted = 0
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self):
+        """Return `True` if a retry is allowed."""
+        with self._lock:
+            if self.tokens < 1:
+                self.exhausted += 1
+                return False
+            self.tokens -= 1
+            self.retries += 1
+            return True
+
+
+class _Attempts(object):
+    """The attempts of a single RPC request."""
+    __slots__ = ('retrier', 'policy', 'details', 'deadline', 'count',
+                 'replayable')
+
+    def __init__(self, retrier, policy, details, replayable):
+        self.retrier = retrier
+        self.policy = policy
+        self.details = details
+        self.deadline = retrier._clock() + details.timeout
+        self.count = 0
+        # Return `False` once the request can no longer be sent again.
+        self.replayable = replayable
+
+    def attempt(self):
+        """Return the details of the next attempt."""
+        self.count += 1
+        timeout = self.deadline - self.retrier._clock()
+        if self.policy.attempt_timeout is not None:
+            timeout = min(timeout, self.policy.attempt_timeout)
+        if self.count == 1:
+            return self.details._replace(timeout=timeout)
+        # The metrics of a retry measure the retry alone.
+        return self.details._replace(timeout=timeout, started=None)
+
+    def backoff(self, exception):
+        """Return the delay before retrying after `exception`, or `None`
+        if the RPC request must not be retried.
+        """
+        # A local failure, e.g. the `CircuitOpenError` or the
+        # `LimitExceededError` of a client-side rejection, fails again
+        # without reaching the server.
+        if (self.count >= self.policy.max_attempts or
+                isinstance(exception, face.LocalError) or
+                status_code(exception) not in self.policy.codes or
+                not self.replayable()):
+            return None
+        delay = self.policy.backoff(self.count, self.retrier._random)
+        # Do not retry if the deadline would pass while waiting.
+        if self.retrier._clock() + delay >= self.deadline:
+            return None
+        budget = self.retrier.budget
+        if budget is not None and not budget.withdraw():
+            return None
+        return delay
+
+    def call(self, request, proceed):
+        while True:
+            try:
+                return proceed(self.attempt(), request)
+            except face.AbortionError as exception:
+                delay = self.backoff(exception)
+                if delay is None:
+                    raise
+            self.retrier._sleep(delay)
+
+
+class _UnsentRequests(object):
+    """Wrap a request iterator and record whether the stub has started
+    to consume it, after which the request cannot be sent again.
+    """
+
+    def __init__(self, iterator):
+        self._iterator = iter(iterator)
+        self.started = False
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        self.started = True
+        return next(self._iterator)
+
+    __next__ = next
+
+    def replayable(self):
+        return not self.started
+
+
+class _RetriedResponses(object):
+    """Wrap a streaming RPC response and issue the RPC request again if
+    it fails before any response message is received.
+    """
+
+    def __init__(self, attempts, request, proceed):
+        self._attempts = attempts
+        self._request = request
+        self._proceed = proceed
+        self._iterator = attempts.call(request, proceed)
+        self._received = False
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        while True:
+            try:
+                message = next(self._iterator)
+            except face.AbortionError as exception:
+                delay = (None if self._received else
+                         self._attempts.backoff(exception))
+                if delay is None:
+                    raise
+            else:
+                self._received = True
+                return message
+            self._attempts.retrier._sleep(delay)
+            self._iterator = self._attempts.call(self._request,
+                                                 self._proceed)
+
+    __next__ = next
+
+    def cancel(self):
+        return self._iterator.cancel()
+
+    def __getattr__(self, attr):
+        return getattr(self._iterator, attr)
+
+
+def _always():
+    return True
+
+
+class Retrier(Interceptor):
+    """An interceptor that retries the RPC requests that fail with a
+    transient status code, with exponential backoff and jitter.
+
+    Only RPC requests that can safely be sent again are retried: unary
+    requests, until a response message is received, and request streams
+    that the stub has not started to consume. Future RPC requests and
+    local failures, e.g. a `CircuitOpenError`, are not retried.
+    """
+
+    def __init__(self, policies, budget=None, sleep=time.sleep,
+                 clock=time.time, random=random.random):
+        """
+        :type policies: dict
+        :param policies: A dictionary mapping the names or qualified
+            names of the retried (idempotent) RPC methods to their
+            `RetryPolicy` objects. A qualified name takes precedence.
+
+        :type budget: RetryBudget
+        :param budget: The retry budget shared by all of the methods, or
+            `None`.
+        """
+        self.policies = dict(policies)
+        self.budget = budget
+        self._sleep = sleep
+        self._clock = clock
+        self._random = random
+
+    def intercept(self, details, request, proceed):
+        policy = lookup(self.policies, details.method)
+        if policy is None or details.future:
+            return proceed(details, request)
+        if self.budget is not None:
+            self.budget.deposit()
+        method = details.method
+        if method.unary_request:
+            replayable = _always
+        else:
+            request = _UnsentRequests(request)
+            replayable = request.replayable
+        attempts = _Attempts(self, policy, details, replayable)
+        if method.unary_response:
+            return attempts.call(request, proceed)
+        return _RetriedResponses(attempts, request, proceed)
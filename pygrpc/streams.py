@@ -0,0 +1,287 @@
+import collections
+import itertools
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class RequestQueue(object):
+    """A bounded, thread-safe request iterator for STREAM_UNARY and
+    STREAM_STREAM RPC methods.
+
+    Producers push request messages with `put`, which blocks while the
+    queue is full, or with `offer`, which returns `False` instead, so
+    that memory stays bounded however fast the producers run. The stub
+    consumes the messages as it sends them. `close` ends the request
+    stream once the queued messages are sent; `abort` discards them and
+    fails the RPC request.
+    """
+
+    def __init__(self, maxsize=1024):
+        """
+        :type maxsize: int
+        :param maxsize: The maximum number of queued request messages.
+        """
+        if maxsize < 1:
+            raise ValueError('The queue size must be positive!')
+        self.maxsize = maxsize
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+        self._exception = None
+        # The largest number of queued messages, the number of messages
+        # consumed, and the number of `put` calls that waited for room.
+        self.high_water = 0
+        self.consumed = 0
+        self.blocked = 0
+
+    @property
+    def depth(self):
+        """The number of queued request messages."""
+        return len(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def put(self, message, timeout=None):
+        """Queue the request `message`, waiting while the queue is full.
+
+        :type timeout: float
+        :param timeout: The maximum number of seconds to wait, or `None`
+            to wait until there is room. `queue.Full` is raised when it
+            elapses.
+        """
+        with self._not_full:
+            if len(self._items) >= self.maxsize and not self._closed:
+                self.blocked += 1
+                if timeout is None:
+                    while (len(self._items) >= self.maxsize and
+                           not self._closed):
+                        self._not_full.wait()
+                else:
+                    expires = time.time() + timeout
+                    while (len(self._items) >= self.maxsize and
+                           not self._closed):
+                        remaining = expires - time.time()
+                        if remaining <= 0:
+                            raise queue.Full
+                        self._not_full.wait(remaining)
+            self._append(message)
+
+    def offer(self, message):
+        """Queue the request `message` and return `True`, or return
+        `False` if the queue is full. Unlike `put` it never blocks, e.g.
+        in an event loop.
+        """
+        with self._lock:
+            if len(self._items) >= self.maxsize and not self._closed:
+                return False
+            self._append(message)
+            return True
+
+    def _append(self, message):
+        if self._closed:
+            raise ValueError('The request stream is closed!')
+        self._items.append(message)
+        if len(self._items) > self.high_water:
+            self.high_water = len(self._items)
+        self._not_empty.notify()
+
+    def close(self):
+        """End the request stream once the queued messages are sent."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def abort(self, exception=None):
+        """Discard the queued messages and fail the RPC request with the
+        `exception` raised from the request iterator.
+        """
+        with self._lock:
+            self._exception = exception or RuntimeError(
+                'The request stream was aborted!'
+            )
+            self._items.clear()
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        with self._not_empty:
+            while not self._items:
+                if self._exception is not None:
+                    raise self._exception
+                if self._closed:
+                    raise StopIteration
+                self._not_empty.wait()
+            message = self._items.popleft()
+            self.consumed += 1
+            self._not_full.notify()
+            return message
+
+    __next__ = next
+
+
+def batches(responses, size=100, interval=None, prefetch=0):
+    """Return an iterator over lists of the messages of a streaming RPC
+    response, e.g. the one returned by `client.request('ListFeatures')`.
+
+    :type size: int
+    :param size: The maximum number of messages per list.
+
+    :type interval: float
+    :param interval: The maximum number of seconds to wait for a full
+        list before returning the messages that have arrived, or `None`
+        to always wait for `size` messages or the end of the stream.
+
+    :type prefetch: int
+    :param prefetch: The number of lists that a background thread reads
+        ahead from the stream while the caller processes the previous
+        one. An `interval` requires a background thread, therefore, it
+        implies a `prefetch` of at least one.
+    """
+    if size < 1:
+        raise ValueError('The batch size must be positive!')
+    if interval is None and not prefetch:
+        return _batches(responses, size)
+    return _PrefetchedBatches(responses, size, interval, max(prefetch, 1))
+
+
+def _batches(responses, size):
+    iterator = iter(responses)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class _Prefetcher(object):
+    """Read a streaming RPC response into a bounded buffer. It is kept
+    apart from `_PrefetchedBatches` so that the reading thread does not
+    keep the batches alive once the caller drops them.
+    """
+
+    def __init__(self, responses, size, limit):
+        self.responses = responses
+        self.size = size
+        self.limit = limit
+        self.buffer = collections.deque()
+        self.condition = threading.Condition()
+        self.done = False
+        self.stopped = False
+        self.exception = None
+
+    def run(self):
+        buffer = self.buffer
+        condition = self.condition
+        try:
+            for message in self.responses:
+                with condition:
+                    while len(buffer) >= self.limit and not self.stopped:
+                        condition.wait()
+                    if self.stopped:
+                        return
+                    buffer.append(message)
+                    # Only wake up the consumer when it may proceed.
+                    if len(buffer) == 1 or len(buffer) >= self.size:
+                        condition.notify_all()
+        except Exception as exception:
+            with condition:
+                self.exception = exception
+        finally:
+            with condition:
+                self.done = True
+                condition.notify_all()
+
+    def stop(self):
+        """Stop reading and cancel the RPC request if it is still in
+        flight.
+        """
+        with self.condition:
+            if self.stopped:
+                return None
+            self.stopped = True
+            self.condition.notify_all()
+        cancel = getattr(self.responses, 'cancel', None)
+        if cancel is not None:
+            return cancel()
+
+
+class _PrefetchedBatches(object):
+    """Read a streaming RPC response on a background thread into a
+    bounded buffer, and return its messages in lists.
+    """
+
+    def __init__(self, responses, size, interval, prefetch):
+        self._size = size
+        self._interval = interval
+        self._prefetcher = _Prefetcher(responses, size, size * prefetch)
+        thread = threading.Thread(target=self._prefetcher.run)
+        thread.daemon = True
+        thread.start()
+
+    def __iter__(self):
+        return self
+
+    def _ready(self, expires):
+        prefetcher = self._prefetcher
+        if prefetcher.done or len(prefetcher.buffer) >= self._size:
+            return True
+        return (expires is not None and prefetcher.buffer and
+                time.time() >= expires)
+
+    def next(self):
+        prefetcher = self._prefetcher
+        buffer = prefetcher.buffer
+        condition = prefetcher.condition
+        expires = None
+        if self._interval is not None:
+            expires = time.time() + self._interval
+        with condition:
+            while not self._ready(expires):
+                if expires is None or not buffer:
+                    condition.wait()
+                else:
+                    condition.wait(max(expires - time.time(), 0))
+            if not buffer:
+                if prefetcher.exception is not None:
+                    raise prefetcher.exception
+                raise StopIteration
+            batch = [buffer.popleft()
+                     for _ in xrange(min(self._size, len(buffer)))]
+            condition.notify_all()
+            return batch
+
+    __next__ = next
+
+    def cancel(self):
+        """Stop reading and cancel the RPC request."""
+        return self._prefetcher.stop()
+
+    def close(self):
+        """Stop reading and cancel the RPC request if the stream has not
+        ended.
+        """
+        prefetcher = self._prefetcher
+        with prefetcher.condition:
+            if prefetcher.done:
+                return
+        prefetcher.stop()
+
+    def __del__(self):
+        self.close()
@@ -1 +1,2 @@
+from _fakes import FakeFuture, FakeMethod, fake_details, unavailable
 from _loader import Loader
@@ -0,0 +1,86 @@
+import threading
+
+from grpc.beta.interfaces import StatusCode
+from grpc.framework.common.cardinality import Cardinality
+from grpc.framework.interfaces.face import face
+from pygrpc import CallDetails
+
+
+class FakeFuture(object):
+    """A minimal future that the test completes by hand."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = False
+        self._cancelled = False
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+    def _complete(self, result=None, exception=None, cancelled=False):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+            self._result = result
+            self._exception = exception
+            self._cancelled = cancelled
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def set_result(self, result):
+        self._complete(result=result)
+
+    def set_exception(self, exception):
+        self._complete(exception=exception)
+
+    def cancel(self):
+        self._complete(cancelled=True)
+        return True
+
+    def done(self):
+        return self._done
+
+    def cancelled(self):
+        return self._cancelled
+
+    def exception(self):
+        return self._exception
+
+    def result(self):
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def add_done_callback(self, callback):
+        with self._lock:
+            if not self._done:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+
+class FakeMethod(object):
+    """The attributes of a `_Method` object that the interceptors read."""
+
+    def __init__(self, name='GetFeature',
+                 cardinality=Cardinality.UNARY_UNARY, service='RouteGuide'):
+        self.name = name
+        self.qualified_name = '{}.{}'.format(service, name)
+        self.cardinality = cardinality
+        self.unary_request = cardinality in (Cardinality.UNARY_UNARY,
+                                             Cardinality.UNARY_STREAM)
+        self.unary_response = cardinality in (Cardinality.UNARY_UNARY,
+                                              Cardinality.STREAM_UNARY)
+
+
+def fake_details(name='GetFeature', cardinality=Cardinality.UNARY_UNARY,
+                 timeout=10, future=False, started=None):
+    """Return the `CallDetails` of an RPC request of a `FakeMethod`."""
+    return CallDetails(name, cardinality, timeout, future,
+                       FakeMethod(name, cardinality), started)
+
+
+def unavailable():
+    return face.NetworkError(None, None, StatusCode.UNAVAILABLE, '')
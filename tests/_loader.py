@@ -10,7 +10,10 @@ class Loader(unittest.TestCase):
     PORT = 50051
 
     def setUp(self):
-        self.client = Client(self.HOST, self.PORT)
+        self.client = self.create_client()
+
+    def create_client(self):
+        return Client(self.HOST, self.PORT)
 
     def test_stub_context(self):
         for stub in self.client.stubs:
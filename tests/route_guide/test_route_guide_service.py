@@ -1,9 +1,16 @@
+import os
 import random
 import route_guide_pb2
 import route_guide_resources
+import tempfile
+import threading
 import time
 import unittest
 
+from pygrpc import (AIMDLimit, Capture, Coalescer, ConcurrencyLimiter,
+                    Hedger, Interceptor, LeastOutstanding, Metrics,
+                    PooledClient, Replayer, RequestQueue, ResponseCache,
+                    batches, columns, read_log)
 from tests import Loader
 
 
@@ -45,6 +52,21 @@ class RouteGuideServiceTestCase(Loader):
     def test_stub_context(self):
         super(RouteGuideServiceTestCase, self).test_stub_context()
 
+    def test_method_index(self):
+        # The stub object is generated on the first request.
+        self.assertEqual(self.client._index.methods, {})
+        self.client._resolve('GetFeature')
+        methods = self.client._index.methods
+        self.assertEqual(sorted(methods), [
+            'GetFeature', 'ListFeatures', 'RecordRoute',
+            'RouteChat', 'RouteGuide.GetFeature', 'RouteGuide.ListFeatures',
+            'RouteGuide.RecordRoute', 'RouteGuide.RouteChat',
+        ])
+        self.assertIs(methods['GetFeature'].request_class,
+                      route_guide_pb2.Point)
+        self.assertIs(methods['ListFeatures'].request_class,
+                      route_guide_pb2.Rectangle)
+
     def test_unary_unary(self):
         res = self.client.request('GetFeature', latitude=409146138,
                                   longitude=(-746188906))
@@ -54,6 +76,168 @@ class RouteGuideServiceTestCase(Loader):
         self.assertEqual(res.location.latitude, 409146138)
         self.assertEqual(res.location.longitude, (-746188906))
 
+    def test_unary_unary_cache(self):
+        self.client.cache = ResponseCache(['GetFeature'])
+        for _ in xrange(3):
+            res = self.client.request('GetFeature', latitude=409146138,
+                                      longitude=(-746188906))
+            self.assertTrue(isinstance(res, route_guide_pb2.Feature))
+            self.assertEqual(res.location.latitude, 409146138)
+        self.assertEqual((self.client.cache.hits, self.client.cache.misses),
+                         (2, 1))
+
+    def test_unary_unary_coalesce(self):
+        self.client.coalescer = Coalescer(['GetFeature'])
+        res = self.client.request('GetFeature', latitude=409146138,
+                                  longitude=(-746188906))
+        self.assertTrue(isinstance(res, route_guide_pb2.Feature))
+        self.assertEqual(res.location.longitude, (-746188906))
+        self.assertEqual(self.client.coalescer.calls, 1)
+
+    def test_unary_unary_message(self):
+        point = route_guide_pb2.Point(latitude=409146138,
+                                      longitude=(-746188906))
+        res = self.client.request('GetFeature', point)
+        self.assertEqual(res.location, point)
+        # A pre-serialized request is passed straight through.
+        res = self.client.request('GetFeature', point.SerializeToString())
+        self.assertTrue(isinstance(res, route_guide_pb2.Feature))
+        self.assertEqual(res.location, point)
+
+    def test_unary_unary_future(self):
+        future = self.client.request_async('GetFeature', latitude=409146138,
+                                           longitude=(-746188906))
+        res = future.result()
+        self.assertTrue(isinstance(res, route_guide_pb2.Feature))
+        self.assertEqual(res.location.latitude, 409146138)
+
+    def test_exception_unary_stream_future(self):
+        with self.assertRaises(AttributeError):
+            self.client.request_async('ListFeatures')
+
+    def test_request_many(self):
+        features = route_guide_resources.read_route_guide_database()[:20]
+        requests = [{'latitude': f.location.latitude,
+                     'longitude': f.location.longitude} for f in features]
+        # A keyword argument that is not a field of `Point` fails only
+        # its own item.
+        requests[5] = {'altitude': 1}
+        requests[6] = features[6].location
+        results = list(self.client.request_many('GetFeature', requests,
+                                                concurrency=4))
+        self.assertEqual([r.index for r in results], range(len(requests)))
+        self.assertFalse(results[5].ok)
+        for result in results[:5] + results[6:]:
+            self.assertTrue(result.ok)
+            self.assertEqual(result.response, features[result.index])
+        # `Result.request` is the item, whether the RPC request failed
+        # or not.
+        self.assertEqual([r.request for r in results], requests)
+        results = self.client.request_many('GetFeature', requests,
+                                           ordered=False)
+        self.assertEqual(sorted(r.index for r in results),
+                         range(len(requests)))
+
+    def test_metrics(self):
+        self.client.metrics = Metrics()
+        self.client.request('GetFeature', latitude=409146138,
+                            longitude=(-746188906))
+        params = {
+            'lo': route_guide_pb2.Point(
+                latitude=400000000, longitude=(-750000000)
+            ),
+            'hi': route_guide_pb2.Point(
+                latitude=420000000, longitude=(-730000000)
+            ),
+        }
+        features = list(self.client.request('ListFeatures', **params))
+        snapshot = self.client.metrics.snapshot()
+        get_feature = snapshot['RouteGuide.GetFeature']
+        self.assertEqual(get_feature['calls'], 1)
+        self.assertEqual(get_feature['messages_received'], 1)
+        list_features = snapshot['RouteGuide.ListFeatures']
+        self.assertEqual(list_features['calls'], 1)
+        self.assertEqual(list_features['messages_received'], len(features))
+        self.assertEqual(list_features['bytes_received'],
+                         sum(f.ByteSize() for f in features))
+
+    def test_interceptors(self):
+        calls = []
+
+        class Record(Interceptor):
+            def intercept(self, details, request, proceed):
+                calls.append((details.name, details.timeout, details.future))
+                return proceed(details._replace(timeout=5), request)
+
+        self.client.interceptors = [Record()]
+        future = self.client.request_async('GetFeature', latitude=409146138,
+                                           longitude=(-746188906))
+        self.assertTrue(isinstance(future.result(), route_guide_pb2.Feature))
+        self.client.metrics = Metrics()
+        self.client.request('GetFeature', latitude=409146138,
+                            longitude=(-746188906), timeout=1)
+        features = list(self.client.request('ListFeatures'))
+        self.assertEqual(calls, [
+            ('GetFeature', self.client.DefaultTimeout, True),
+            ('GetFeature', 1, False),
+            ('ListFeatures', self.client.DefaultTimeout, False),
+        ])
+        # The metrics observe the calls made by the interceptors.
+        snapshot = self.client.metrics.snapshot()
+        self.assertEqual(snapshot['RouteGuide.GetFeature']['calls'], 1)
+        self.assertEqual(
+            snapshot['RouteGuide.ListFeatures']['messages_received'],
+            len(features)
+        )
+
+    def test_unary_unary_hedged(self):
+        hedger = Hedger(['GetFeature'], delay=0)
+        self.client.interceptors = [hedger]
+        for _ in xrange(4):
+            response = self.client.request('GetFeature', latitude=409146138,
+                                           longitude=(-746188906))
+            self.assertEqual(response.location.latitude, 409146138)
+        self.assertEqual(hedger.outstanding, 0)
+
+    def test_limiter(self):
+        limiter = ConcurrencyLimiter(AIMDLimit(initial=4))
+        self.client.interceptors = [limiter]
+        responses = self.client.request('ListFeatures')
+        # The open stream holds a slot until it ends.
+        self.assertEqual(limiter.inflight, 1)
+        res = self.client.request('GetFeature', latitude=409146138,
+                                  longitude=(-746188906))
+        self.assertTrue(isinstance(res, route_guide_pb2.Feature))
+        list(responses)
+        self.assertEqual((limiter.inflight, limiter.queued), (0, 0))
+
+    def test_capture_replay(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            capture = Capture(path)
+            self.client.interceptors = [capture]
+            self.client.request('GetFeature', latitude=409146138,
+                                longitude=(-746188906))
+            features = route_guide_resources.read_route_guide_database()[:5]
+            self.client.request('RecordRoute',
+                                iter([f.location for f in features]))
+            list(self.client.request('ListFeatures'))
+            capture.close()
+            self.client.interceptors = []
+            calls = read_log(path)
+            names = ['RouteGuide.GetFeature', 'RouteGuide.RecordRoute',
+                     'RouteGuide.ListFeatures']
+            self.assertEqual([call.name for call in calls], names)
+            self.assertEqual(len(calls[1].messages), 5)
+            report = Replayer(self.client, calls, speed=None).run()
+        finally:
+            os.remove(path)
+        self.assertEqual(report['calls'], 3)
+        for name in names:
+            self.assertEqual(report['methods'][name]['errors'], {})
+            self.assertEqual(report['methods'][name]['latency']['count'], 1)
+
     def test_unary_stream(self):
         params = {
             'lo': route_guide_pb2.Point(
@@ -74,6 +258,40 @@ class RouteGuideServiceTestCase(Loader):
             )
             self.assertTrue(isinstance(response, route_guide_pb2.Feature))
 
+    def test_unary_stream_batches(self):
+        features = list(self.client.request('ListFeatures'))
+        for prefetch in (0, 2):
+            lists = list(batches(self.client.request('ListFeatures'),
+                                 size=10, prefetch=prefetch))
+            self.assertTrue(all(len(batch) <= 10 for batch in lists))
+            self.assertEqual(sum(lists, []), features)
+
+    def test_unary_stream_columns(self):
+        features = list(self.client.request('ListFeatures'))
+        result = columns(self.client.request('ListFeatures'),
+                         ['location.latitude', 'name'])
+        self.assertEqual(list(result['location.latitude']),
+                         [f.location.latitude for f in features])
+        self.assertEqual(list(result['name']), [f.name for f in features])
+
+    def test_unary_stream_raw(self):
+        params = {
+            'lo': route_guide_pb2.Point(
+                latitude=400000000, longitude=(-750000000)
+            ),
+            'hi': route_guide_pb2.Point(
+                latitude=420000000, longitude=(-730000000)
+            ),
+        }
+        responses = list(self.client.request('ListFeatures', raw=True,
+                                             **params))
+        self.assertTrue(responses)
+        for response in responses:
+            # The payloads are returned without being deserialized.
+            self.assertTrue(isinstance(response, bytes))
+            feature = route_guide_pb2.Feature.FromString(response)
+            self.assertTrue(400000000 < feature.location.latitude < 420000000)
+
     def test_stream_unary(self):
         feature_list = route_guide_resources.read_route_guide_database()
         route_iter = self.generate_route(feature_list)
@@ -81,6 +299,30 @@ class RouteGuideServiceTestCase(Loader):
                                   timeout=self._TIMEOUT)
         self.assertTrue(isinstance(res, route_guide_pb2.RouteSummary))
 
+    def test_stream_unary_queue(self):
+        feature_list = route_guide_resources.read_route_guide_database()
+        requests = RequestQueue(maxsize=4)
+
+        def produce():
+            for feature in feature_list[:50]:
+                requests.put(feature.location)
+            requests.close()
+        producer = threading.Thread(target=produce)
+        producer.start()
+        res = self.client.request('RecordRoute', requests,
+                                  timeout=self._TIMEOUT)
+        producer.join()
+        self.assertEqual(res.point_count, 50)
+        self.assertTrue(requests.high_water <= 4)
+
+    def test_stream_unary_future(self):
+        feature_list = route_guide_resources.read_route_guide_database()
+        route_iter = self.generate_route(feature_list)
+        future = self.client.request_async('RecordRoute', route_iter,
+                                           timeout=self._TIMEOUT)
+        self.assertTrue(isinstance(future.result(),
+                                   route_guide_pb2.RouteSummary))
+
     def test_stream_stream(self):
         responses = self.client.request('RouteChat', self.generate_messages(),
                                         timeout=self._TIMEOUT)
@@ -90,5 +332,27 @@ class RouteGuideServiceTestCase(Loader):
     def tearDown(self):
         del self.client
 
+
+class PooledRouteGuideServiceTestCase(RouteGuideServiceTestCase):
+    _SIZE = 3
+
+    def create_client(self):
+        return PooledClient([(self.HOST, self.PORT)], size=self._SIZE,
+                            policy=LeastOutstanding())
+
+    def test_endpoints(self):
+        endpoints = self.client.endpoints
+        self.assertEqual(len(endpoints), self._SIZE)
+        streams = [self.client.request('ListFeatures')
+                   for _ in xrange(self._SIZE)]
+        # Each open stream is in flight on a different channel.
+        self.assertEqual([e.outstanding for e in endpoints],
+                         [1] * self._SIZE)
+        for stream in streams:
+            list(stream)
+        self.assertEqual([e.outstanding for e in endpoints],
+                         [0] * self._SIZE)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from grpc.framework.foundation.future import CancelledError
+from pygrpc import Client, Interceptor
+from tests import FakeFuture
+
+
+class _Complete(Interceptor):
+    """Complete the RPC requests without the server: echo the latitude
+    of the requested point, or cancel them.
+    """
+
+    def __init__(self, cancel=False):
+        self.cancel = cancel
+
+    def intercept(self, details, request, proceed):
+        future = FakeFuture()
+        if self.cancel:
+            future.cancel()
+        else:
+            future.set_result(request.latitude)
+        return future
+
+
+class RequestManyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client('localhost', 50051)
+        self.client.load('tests.route_guide.route_guide_pb2')
+
+    def test_failed_item(self):
+        self.client.interceptors = [_Complete()]
+        requests = [{'latitude': i} for i in xrange(5)]
+        # A keyword argument that is not a field of `Point` fails only
+        # its own item.
+        requests[2] = {'altitude': 1}
+        results = list(self.client.request_many('GetFeature', requests,
+                                                concurrency=2))
+        self.assertEqual([r.index for r in results], range(5))
+        self.assertEqual([r.ok for r in results],
+                         [True, True, False, True, True])
+        self.assertEqual([r.response for r in results], [0, 1, None, 3, 4])
+        self.assertEqual([r.request for r in results], requests)
+
+    def test_cancelled(self):
+        self.client.interceptors = [_Complete(cancel=True)]
+        requests = [{'latitude': 409146138, 'longitude': -746188906}] * 3
+        results = list(self.client.request_many('GetFeature', requests,
+                                                concurrency=2))
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertTrue(isinstance(result.exception, CancelledError))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+
+from grpc.beta.interfaces import StatusCode
+from grpc.framework.common.cardinality import Cardinality
+from grpc.framework.interfaces.face import face
+from pygrpc import CircuitBreaker, CircuitOpenError
+from pygrpc.breaker import CLOSED, HALF_OPEN, OPEN
+from tests import FakeFuture, fake_details, unavailable
+
+
+class CircuitBreakerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = CircuitBreaker(window=4, min_calls=4, error_rate=0.5,
+                                      open_seconds=10,
+                                      clock=lambda: self.now)
+        self.details = fake_details()
+
+    def call(self, exception=None, latency=0):
+        def proceed(details, request):
+            self.now += latency
+            if exception is not None:
+                raise exception
+            return 'A'
+        return self.breaker.intercept(self.details, 'req', proceed)
+
+    def fail(self, count):
+        for _ in xrange(count):
+            with self.assertRaises(face.NetworkError):
+                self.call(unavailable())
+
+    def test_open(self):
+        self.call()
+        self.call()
+        self.fail(1)
+        self.assertEqual(self.breaker.state('RouteGuide.GetFeature'), CLOSED)
+        self.fail(1)
+        self.assertEqual(self.breaker.state('RouteGuide.GetFeature'), OPEN)
+        # An open circuit fails fast.
+        with self.assertRaises(CircuitOpenError):
+            self.call()
+        self.assertEqual((self.breaker.trips, self.breaker.rejected), (1, 1))
+
+    def test_caller_errors(self):
+        error = face.RemoteError(None, None, StatusCode.INVALID_ARGUMENT, '')
+        for _ in xrange(4):
+            with self.assertRaises(face.RemoteError):
+                self.call(error)
+        self.assertEqual(self.breaker.state('RouteGuide.GetFeature'), CLOSED)
+
+    def test_half_open(self):
+        self.fail(4)
+        self.now += 10
+        self.assertEqual(self.call(), 'A')
+        self.assertEqual(self.breaker.state('RouteGuide.GetFeature'), CLOSED)
+        self.fail(4)
+        self.now += 10
+        self.fail(1)
+        # The failed trial call opens the circuit again.
+        self.assertEqual(self.breaker.state('RouteGuide.GetFeature'), OPEN)
+
+    def test_half_open_trials(self):
+        self.fail(4)
+        self.now += 10
+        circuit = self.breaker.circuit('RouteGuide.GetFeature')
+        self.assertTrue(circuit.allow())
+        self.assertEqual(circuit.state, HALF_OPEN)
+        # A single trial call is admitted at a time.
+        self.assertFalse(circuit.allow())
+
+    def test_abandoned_trial(self):
+        self.fail(4)
+        self.now += 10
+        details = fake_details(cardinality=Cardinality.UNARY_STREAM)
+        responses = self.breaker.intercept(
+            details, 'req', lambda details, request: iter(['A', 'B'])
+        )
+        next(responses)
+        circuit = self.breaker.circuit('RouteGuide.GetFeature')
+        self.assertFalse(circuit.allow())
+        # The trial stream that is not read to the end gives back its
+        # admission when it is garbage collected.
+        del responses
+        self.assertTrue(circuit.allow())
+        circuit.release()
+        responses = self.breaker.intercept(
+            details, 'req', lambda details, request: iter(['A', 'B'])
+        )
+        responses.close()
+        self.assertEqual(circuit.state, HALF_OPEN)
+        self.assertTrue(circuit.allow())
+
+    def test_cancelled_trial(self):
+        self.fail(4)
+        self.now += 10
+        future = FakeFuture()
+        self.breaker.intercept(fake_details(future=True), 'req',
+                               lambda details, request: future)
+        future.cancel()
+        # The cancelled trial call neither closes the circuit nor keeps
+        # its admission.
+        circuit = self.breaker.circuit('RouteGuide.GetFeature')
+        self.assertEqual(circuit.state, HALF_OPEN)
+        self.assertTrue(circuit.allow())
+
+    def test_slow_calls(self):
+        self.breaker.slow_call = 1
+        for _ in xrange(4):
+            self.call(latency=2)
+        self.assertEqual(self.breaker.state('RouteGuide.GetFeature'), OPEN)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from pygrpc import ResponseCache
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = ResponseCache(['GetFeature'], ttl=10, max_entries=2,
+                                   clock=lambda: self.now)
+
+    def test_hit_and_miss(self):
+        self.assertIsNone(self.cache.get(('GetFeature', 'a')))
+        self.cache.put(('GetFeature', 'a'), 'A')
+        self.assertEqual(self.cache.get(('GetFeature', 'a')), 'A')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_ttl(self):
+        self.cache.put(('GetFeature', 'a'), 'A')
+        self.now = 10
+        self.assertIsNone(self.cache.get(('GetFeature', 'a')))
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.size, 0)
+
+    def test_lru_eviction(self):
+        self.cache.put(('GetFeature', 'a'), 'A')
+        self.cache.put(('GetFeature', 'b'), 'B')
+        # Touch `a` so that `b` is the least recently used entry.
+        self.cache.get(('GetFeature', 'a'))
+        self.cache.put(('GetFeature', 'c'), 'C')
+        self.assertIn(('GetFeature', 'a'), self.cache)
+        self.assertNotIn(('GetFeature', 'b'), self.cache)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_max_bytes(self):
+        cache = ResponseCache(['GetFeature'], max_entries=None, max_bytes=4)
+        cache.put(('GetFeature', 'a'), 'A')
+        cache.put(('GetFeature', 'b'), 'B')
+        cache.put(('GetFeature', 'c'), 'C')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.size, 4)
+        # An entry larger than `max_bytes` is never cached.
+        cache.put(('GetFeature', 'd'), 'DDDD')
+        self.assertNotIn(('GetFeature', 'd'), cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
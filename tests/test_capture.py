@@ -0,0 +1,203 @@
+import itertools
+import os
+import struct
+import tempfile
+import unittest
+import warnings
+
+from grpc.framework.common.cardinality import Cardinality
+from grpc.framework.interfaces.face import face
+from pygrpc import Capture, Replayer, read_log
+from pygrpc.capture import CALL, DONE, MAGIC, CapturedCall
+from tests import FakeFuture, fake_details, unavailable
+
+
+class CaptureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.now = 100.0
+
+    def capture(self, **kwargs):
+        return Capture(self.path, clock=lambda: self.now, **kwargs)
+
+    def test_capture(self):
+        with self.capture() as capture:
+            response = capture.intercept(
+                fake_details('GetFeature'), b'point',
+                lambda details, request: 'feature'
+            )
+            self.assertEqual(response, 'feature')
+
+            def record_route(details, requests):
+                for _ in requests:
+                    self.now += 0.5
+                return 'summary'
+            capture.intercept(
+                fake_details('RecordRoute', Cardinality.STREAM_UNARY,
+                             timeout=5),
+                iter([b'a', b'b']), record_route
+            )
+            responses = capture.intercept(
+                fake_details('ListFeatures', Cardinality.UNARY_STREAM), b'',
+                lambda details, request: iter([b'x', b'y', b'z'])
+            )
+            self.now += 2
+            self.assertEqual(list(responses), [b'x', b'y', b'z'])
+        calls = read_log(self.path)
+        # The qualified names select the service when the calls are
+        # replayed.
+        self.assertEqual([call.name for call in calls],
+                         ['RouteGuide.GetFeature', 'RouteGuide.RecordRoute',
+                          'RouteGuide.ListFeatures'])
+        self.assertEqual(calls[0].messages, [(0, b'point')])
+        self.assertEqual((calls[0].status, calls[0].responses), ('OK', 1))
+        route = calls[1]
+        self.assertEqual((route.cardinality, route.timeout),
+                         (Cardinality.STREAM_UNARY, 5))
+        # The time each message of the request stream was sent.
+        self.assertEqual(route.messages, [(0, b'a'), (0.5, b'b')])
+        self.assertEqual(route.closed, 101.0)
+        self.assertEqual((calls[2].ended - calls[2].started,
+                          calls[2].responses), (2, 3))
+
+    def test_failures(self):
+        capture = self.capture(methods=['GetFeature'])
+        error = unavailable()
+
+        def fail(details, request):
+            raise error
+        with self.assertRaises(face.NetworkError):
+            capture.intercept(fake_details('GetFeature'), b'', fail)
+        future = FakeFuture()
+        capture.intercept(
+            fake_details('GetFeature', future=True),
+            b'', lambda details, request: future
+        )
+        future.cancel()
+        # Other RPC methods are not captured.
+        capture.intercept(fake_details('SayHello'), b'',
+                          lambda details, request: None)
+        capture.close()
+        self.assertEqual([call.status for call in read_log(self.path)],
+                         ['UNAVAILABLE', 'CANCELLED'])
+        self.assertEqual(capture.captured, 2)
+
+    def test_append(self):
+        for name in ('GetFeature', 'SayHello'):
+            with self.capture() as capture:
+                capture.intercept(fake_details(name), b'',
+                                  lambda details, request: None)
+        # Append a truncated record.
+        with open(self.path, 'ab') as f:
+            f.write(MAGIC + b'\x01\x00')
+        self.assertEqual([call.name for call in read_log(self.path)],
+                         ['RouteGuide.GetFeature', 'RouteGuide.SayHello'])
+
+    def test_truncated_session(self):
+        with self.capture() as capture:
+            capture.intercept(fake_details('GetFeature'), b'',
+                              lambda details, request: None)
+        # A record truncated when the process ended, whose length spans
+        # the next session.
+        with open(self.path, 'ab') as f:
+            f.write(struct.pack('<BIdI', CALL, 1, self.now, 64) + b'\x00')
+        with self.capture() as capture:
+            capture.intercept(fake_details('SayHello'), b'hello',
+                              lambda details, request: None)
+        calls = read_log(self.path)
+        self.assertEqual([call.name for call in calls],
+                         ['RouteGuide.GetFeature', 'RouteGuide.SayHello'])
+        self.assertEqual(calls[1].messages, [(0, b'hello')])
+
+    def test_call_numbers(self):
+        with self.capture() as capture:
+            capture._calls = itertools.count(2 ** 32 - 1)
+            for name in ('GetFeature', 'SayHello'):
+                capture.intercept(fake_details(name), b'',
+                                  lambda details, request: None)
+                self.now += 1
+        # The call numbers wrap around.
+        self.assertEqual([(call.name, call.status)
+                          for call in read_log(self.path)],
+                         [('RouteGuide.GetFeature', 'OK'),
+                          ('RouteGuide.SayHello', 'OK')])
+
+    def test_writer_failure(self):
+        capture = self.capture(flush_interval=60)
+        # A record that cannot be encoded.
+        capture._pending.append((DONE, 0, self.now, (-1, 'OK')))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            capture.close()
+        self.assertEqual([warning.category for warning in caught],
+                         [RuntimeWarning])
+
+    def tearDown(self):
+        os.remove(self.path)
+
+
+class _Client(object):
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, name, request, raw=False, timeout=None):
+        if not isinstance(request, bytes):
+            request = list(request)
+        self.requests.append((name, request, raw, timeout))
+        if name == 'Fail':
+            raise unavailable()
+        if name == 'ListFeatures':
+            return iter([b'x'])
+        return b'response'
+
+
+def _call(name, cardinality, started, messages):
+    return CapturedCall(name, cardinality, None, started, messages, None,
+                        started + 1, 'OK', 1)
+
+
+class ReplayerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = [
+            _call('ListFeatures', Cardinality.UNARY_STREAM, 10, [(0, b'r')]),
+            _call('RecordRoute', Cardinality.STREAM_UNARY, 12,
+                  [(0, b'a'), (1, b'b')]),
+            _call('Fail', Cardinality.UNARY_UNARY, 11, [(0, b'')]),
+        ]
+
+    def test_max_speed(self):
+        client = _Client()
+        report = Replayer(client, self.calls, speed=None,
+                          concurrency=1).run()
+        self.assertEqual(client.requests, [
+            ('ListFeatures', b'r', True, None),
+            ('Fail', b'', True, None),
+            ('RecordRoute', [b'a', b'b'], True, None),
+        ])
+        self.assertEqual(report['calls'], 3)
+        self.assertEqual(report['methods']['Fail']['errors'],
+                         {'UNAVAILABLE': 1})
+        self.assertEqual(
+            report['methods']['RecordRoute']['captured_latency']['count'], 1
+        )
+
+    def test_speed(self):
+        self.now = 0.0
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            self.now += seconds
+        Replayer(_Client(), self.calls, speed=2, concurrency=1,
+                 clock=lambda: self.now, sleep=sleep).run()
+        # The calls start 0.5 and 1 second apart, and the messages of the
+        # request stream 0.5 second apart.
+        self.assertEqual(sleeps, [0.5, 0.5, 0.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+import imp
+import sys
+import threading
+import unittest
+import warnings
+
+from grpc.framework.interfaces.face import face
+from pygrpc import (Interceptor, Metrics, PooledClient, ResponseCache,
+                    deadline)
+from tests import Loader
+from tests.helloworld import helloworld_pb2
+from tests.route_guide import route_guide_pb2
+
+
+class _CopyStub(object):
+    """A Greeter stub whose `SayHello` answers without the server, so
+    that the tests can tell which service an RPC request reaches.
+    """
+
+    def __init__(self, stub):
+        self._stub = stub
+
+    def __getattr__(self, name):
+        return getattr(self._stub, name)
+
+    def SayHello(self, request, timeout, **kwargs):
+        return helloworld_pb2.HelloReply(message='Copy')
+
+
+class MultiModuleTestCase(Loader):
+
+    def setUp(self):
+        super(MultiModuleTestCase, self).setUp()
+        self.client.load('.helloworld_pb2', package='tests.helloworld')
+        self.client.load('.route_guide_pb2', package='tests.route_guide')
+
+    def test_load_accumulates(self):
+        res = self.client.request('SayHello', name='you')
+        self.assertTrue(isinstance(res, helloworld_pb2.HelloReply))
+        res = self.client.request('GetFeature', latitude=409146138,
+                                  longitude=(-746188906))
+        self.assertTrue(isinstance(res, route_guide_pb2.Feature))
+        self.assertEqual(len(self.client.stubs), 2)
+
+    def test_qualified_name(self):
+        res = self.client.request('Greeter.SayHello', name='you')
+        self.assertEqual(res.message, 'Hello, you!')
+
+    def test_unload(self):
+        self.client.unload('.helloworld_pb2', package='tests.helloworld')
+        with self.assertRaises(AttributeError):
+            self.client.request('SayHello', name='you')
+        res = self.client.request('GetFeature', latitude=409146138,
+                                  longitude=(-746188906))
+        self.assertTrue(isinstance(res, route_guide_pb2.Feature))
+        with self.assertRaises(ValueError):
+            self.client.unload('.helloworld_pb2', package='tests.helloworld')
+
+    def load_copy(self):
+        """Load a module that defines a second service with a `SayHello`
+        method.
+        """
+        module = imp.new_module('tests._greeter_copy_pb2')
+        module.BetaCopyStub = helloworld_pb2.BetaGreeterStub
+        module.beta_create_Copy_stub = lambda channel, **kwargs: _CopyStub(
+            helloworld_pb2.beta_create_Greeter_stub(channel, **kwargs)
+        )
+        sys.modules[module.__name__] = module
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                self.client.load(module.__name__)
+            self.assertTrue(caught)
+        finally:
+            del sys.modules[module.__name__]
+
+    def test_collision(self):
+        self.load_copy()
+        self.assertEqual(self.client.collisions['SayHello'],
+                         ['Greeter.SayHello', 'Copy.SayHello'])
+        res = self.client.request('SayHello', name='you')
+        self.assertEqual(res.message, 'Hello, you!')
+        res = self.client.request('Copy.SayHello', name='you')
+        self.assertEqual(res.message, 'Copy')
+
+    def test_collision_cache(self):
+        self.load_copy()
+        self.client.cache = ResponseCache(['SayHello'])
+        for name in ('Greeter.SayHello', 'Copy.SayHello'):
+            self.client.request(name, name='you')
+        # Each service has its own cache entry.
+        self.assertEqual(len(self.client.cache), 2)
+
+    def tearDown(self):
+        del self.client
+
+
+class PooledMultiModuleTestCase(MultiModuleTestCase):
+
+    def create_client(self):
+        return PooledClient([(self.HOST, self.PORT)], size=2)
+
+
+class _Timeouts(Interceptor):
+    """Record the timeout of every RPC request."""
+
+    def __init__(self):
+        self.timeouts = []
+
+    def intercept(self, details, request, proceed):
+        self.timeouts.append(details.timeout)
+        return proceed(details, request)
+
+
+class TimeoutTestCase(Loader):
+
+    def setUp(self):
+        super(TimeoutTestCase, self).setUp()
+        self.recorder = _Timeouts()
+        self.client.interceptors = [self.recorder]
+        self.client.load('.helloworld_pb2', package='tests.helloworld',
+                         timeouts={'Greeter': 3})
+        self.client.load('.route_guide_pb2', package='tests.route_guide',
+                         timeouts={'RouteGuide': 4, 'GetFeature': 2,
+                                   'RouteGuide.ListFeatures': 1})
+
+    def test_load_timeouts(self):
+        self.client.request('SayHello', name='you')
+        self.client.request('GetFeature', latitude=1, longitude=2)
+        list(self.client.request('ListFeatures'))
+        self.client.request('GetFeature', latitude=1, longitude=2,
+                            timeout=5)
+        self.assertEqual(self.recorder.timeouts, [3, 2, 1, 5])
+
+    def test_default_timeout(self):
+        self.client.unload('.helloworld_pb2', package='tests.helloworld')
+        self.client.load('.helloworld_pb2', package='tests.helloworld')
+        self.client.request('SayHello', name='you')
+        self.assertEqual(self.recorder.timeouts,
+                         [self.client.DefaultTimeout])
+
+    def test_deadline(self):
+        with deadline(1.5):
+            self.client.request('SayHello', name='you')
+            with deadline(60):
+                # A nested deadline cannot extend the enclosing one.
+                self.client.request('SayHello', name='you')
+            self.client.request('GetFeature', latitude=1, longitude=2,
+                                timeout=0.5)
+        self.client.request('SayHello', name='you')
+        first, nested, explicit, outside = self.recorder.timeouts
+        self.assertTrue(0 < nested <= first <= 1.5)
+        self.assertEqual(explicit, 0.5)
+        self.assertEqual(outside, 3)
+
+    def test_deadline_fail_fast(self):
+        with deadline(0):
+            with self.assertRaises(face.ExpirationError):
+                self.client.request('SayHello', name='you')
+        # The RPC request was not sent.
+        self.assertEqual(self.recorder.timeouts, [])
+
+    def tearDown(self):
+        del self.client
+
+
+class ConcurrencyTestCase(Loader):
+    _THREADS = 16
+    _ROUNDS = 50
+
+    def setUp(self):
+        super(ConcurrencyTestCase, self).setUp()
+        self.client.load('.route_guide_pb2', package='tests.route_guide')
+
+    def test_load_while_requesting(self):
+        stop = threading.Event()
+        errors = []
+
+        def work():
+            while not stop.is_set():
+                try:
+                    res = self.client.request('GetFeature',
+                                              latitude=409146138,
+                                              longitude=(-746188906))
+                    assert isinstance(res, route_guide_pb2.Feature)
+                    try:
+                        res = self.client.request('SayHello', name='you')
+                    except AttributeError:
+                        # The module is unloaded at the moment.
+                        continue
+                    assert isinstance(res, helloworld_pb2.HelloReply)
+                except Exception as exception:
+                    errors.append(exception)
+                    return
+
+        workers = [threading.Thread(target=work)
+                   for _ in xrange(self._THREADS)]
+        for worker in workers:
+            worker.start()
+        try:
+            for i in xrange(self._ROUNDS):
+                self.client.load('.helloworld_pb2',
+                                 package='tests.helloworld')
+                self.client.metrics = Metrics() if i % 2 else None
+                self.client.interceptors = [Interceptor()] * (i % 3)
+                self.client.unload('.helloworld_pb2',
+                                   package='tests.helloworld')
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(self.client._index.factories[0].methods),
+                         ['GetFeature', 'ListFeatures', 'RecordRoute',
+                          'RouteChat'])
+
+    def tearDown(self):
+        del self.client
+
+
+if __name__ == '__main__':
+    unittest.main()
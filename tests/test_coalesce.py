@@ -0,0 +1,82 @@
+import threading
+import time
+import unittest
+
+from pygrpc import Coalescer
+
+
+class CoalescerTestCase(unittest.TestCase):
+    _THREADS = 8
+
+    def setUp(self):
+        self.coalescer = Coalescer(['GetFeature'])
+        self.release = threading.Event()
+        self.calls = []
+
+    def fetch(self):
+        self.calls.append(None)
+        self.release.wait()
+        return 'A'
+
+    def run_threads(self, target):
+        threads = [threading.Thread(target=target)
+                   for _ in xrange(self._THREADS)]
+        for thread in threads:
+            thread.start()
+        # Wait until every thread is either in flight or waiting.
+        while (self.coalescer.calls + self.coalescer.deduplicated <
+               self._THREADS):
+            time.sleep(0.001)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+
+    def test_identical_requests(self):
+        results = []
+        self.run_threads(lambda: results.append(
+            self.coalescer.do(('GetFeature', 'a'), self.fetch)
+        ))
+        self.assertEqual(results, ['A'] * self._THREADS)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.coalescer.deduplicated, self._THREADS - 1)
+        # The key is released once the shared request completes.
+        self.assertEqual(self.coalescer.do(('GetFeature', 'a'), self.fetch),
+                         'A')
+        self.assertEqual(len(self.calls), 2)
+
+    def test_shared_exception(self):
+        errors = []
+
+        def fetch():
+            self.release.wait()
+            raise KeyError('a')
+
+        def target():
+            try:
+                self.coalescer.do(('GetFeature', 'a'), fetch)
+            except KeyError as error:
+                errors.append(error)
+
+        self.run_threads(target)
+        self.assertEqual(len(errors), self._THREADS)
+
+    def test_shared_base_exception(self):
+        errors = []
+
+        def fetch():
+            self.release.wait()
+            raise KeyboardInterrupt()
+
+        def target():
+            try:
+                errors.append(self.coalescer.do(('GetFeature', 'a'), fetch))
+            except KeyboardInterrupt as error:
+                errors.append(error)
+
+        self.run_threads(target)
+        self.assertEqual([type(error) for error in errors],
+                         [KeyboardInterrupt] * self._THREADS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from pygrpc import columns
+from pygrpc.columnar import numpy
+from tests.route_guide import route_guide_pb2
+
+
+class ColumnsTestCase(unittest.TestCase):
+    _FIELDS = ['location.latitude', 'location.longitude', 'name']
+
+    def features(self, count):
+        for i in xrange(count):
+            yield route_guide_pb2.Feature(
+                name='feature {}'.format(i),
+                location=route_guide_pb2.Point(latitude=i, longitude=-i)
+            )
+
+    def test_columns(self):
+        # The chunk size does not divide the number of messages.
+        result = columns(self.features(10), self._FIELDS, chunk_size=3,
+                         use_numpy=False)
+        self.assertEqual(list(result['location.latitude']), range(10))
+        self.assertEqual(list(result['location.longitude']),
+                         [-i for i in xrange(10)])
+        self.assertEqual(result['name'][9], 'feature 9')
+        # The numeric columns are compact arrays.
+        self.assertEqual(result['location.latitude'].typecode, 'i')
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy(self):
+        result = columns(self.features(10), self._FIELDS, chunk_size=3)
+        self.assertEqual(result['location.latitude'].dtype, numpy.int32)
+        self.assertEqual(result['location.latitude'].sum(), 45)
+
+    def test_empty(self):
+        result = columns(iter([]), self._FIELDS, use_numpy=False)
+        self.assertEqual(result, dict((path, []) for path in self._FIELDS))
+
+    def test_invalid_field(self):
+        for path in ('location.altitude', 'location', 'name.length'):
+            with self.assertRaises(ValueError):
+                columns(self.features(1), [path], use_numpy=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import collections
+import unittest
+import zlib
+
+from grpc.framework.common.cardinality import Cardinality
+from pygrpc import Client, Compression, ResponseCache
+from pygrpc.compression import DEFLATE, GZIP, _compressed_size
+from pygrpc.pygrpc import RAW, _issue
+from tests import FakeMethod
+from tests.route_guide import route_guide_pb2
+
+
+class _MultiCallable(object):
+    """Record the keyword arguments of the calls, e.g. the protocol
+    options.
+    """
+
+    def __init__(self, response='response'):
+        self.calls = []
+        self.response = response
+
+    def __call__(self, request, timeout, **kwargs):
+        self.calls.append(kwargs)
+        if isinstance(request, collections.Iterator):
+            # Send the request stream.
+            list(request)
+        return self.response
+
+    def future(self, request, timeout, **kwargs):
+        return self(request, timeout, **kwargs)
+
+
+class CompressionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+
+    def clock(self):
+        # Each reading advances the clock by half a second.
+        self.now += 0.5
+        return self.now
+
+    def test_threshold(self):
+        compression = Compression(threshold=100, sample=1, clock=self.clock)
+        _, options = compression.prepare(FakeMethod(), b'x' * 99)
+        self.assertTrue(options.disable_compression)
+        request, options = compression.prepare(FakeMethod(), b'x' * 1000)
+        self.assertEqual(request, b'x' * 1000)
+        self.assertFalse(options.disable_compression)
+        stats = compression.snapshot()['RouteGuide.GetFeature']
+        self.assertEqual((stats['enabled_calls'], stats['disabled_calls']),
+                         (1, 1))
+        # Only the RPC request that allows compression is sampled, and
+        # its size after compression is estimated with `zlib`.
+        size = _compressed_size(b'x' * 1000, GZIP, 6)
+        self.assertEqual((stats['messages'], stats['bytes'],
+                          stats['estimated_bytes']), (1, 1000, size))
+        self.assertEqual(stats['estimated_ratio'], size / 1000.0)
+        self.assertEqual(stats['estimate_seconds'], 0.5)
+
+    def test_methods(self):
+        compression = Compression(threshold=None, methods={
+            'ListFeatures': 0,
+            'Copy.ListFeatures': None,
+        })
+        self.assertEqual(compression.threshold_for(FakeMethod()), None)
+        self.assertEqual(compression.threshold_for(
+            FakeMethod('ListFeatures')
+        ), 0)
+        # A qualified method name takes precedence.
+        self.assertEqual(compression.threshold_for(
+            FakeMethod('ListFeatures', service='Copy')
+        ), None)
+        _, options = compression.prepare(FakeMethod(), b'x' * 10000)
+        self.assertTrue(options.disable_compression)
+        _, options = compression.prepare(FakeMethod('ListFeatures'), b'')
+        self.assertFalse(options.disable_compression)
+        with self.assertRaises(ValueError):
+            Compression(algorithm='brotli')
+
+    def test_stream(self):
+        compression = Compression(sample=1, algorithm=DEFLATE)
+        requests, options = compression.prepare(
+            FakeMethod('RecordRoute', Cardinality.STREAM_UNARY),
+            iter([b'a', b'bc'])
+        )
+        self.assertFalse(options.disable_compression)
+        self.assertEqual(list(requests), [b'a', b'bc'])
+        stats = compression.snapshot()['RouteGuide.RecordRoute']
+        self.assertEqual((stats['messages'], stats['bytes']), (2, 3))
+        self.assertEqual(stats['estimated_bytes'],
+                         len(zlib.compress(b'a', 6)) +
+                         len(zlib.compress(b'bc', 6)))
+        compression.reset()
+        self.assertEqual(compression.snapshot(), {})
+
+    def test_services(self):
+        compression = Compression(threshold=0)
+        for service in ('Greeter', 'Copy'):
+            compression.prepare(FakeMethod('SayHello', service=service), b'')
+        self.assertEqual(sorted(compression.snapshot()),
+                         ['Copy.SayHello', 'Greeter.SayHello'])
+
+    def test_compressed_size(self):
+        payload = b'features ' * 100
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        gzipped = compressor.compress(payload) + compressor.flush()
+        self.assertEqual(_compressed_size(payload, GZIP, 6), len(gzipped))
+        self.assertEqual(_compressed_size(payload, DEFLATE, 6),
+                         len(zlib.compress(payload, 6)))
+
+    def test_issue(self):
+        multi_callable = _MultiCallable()
+        _issue(multi_callable, b'', 1, False)
+        _issue(multi_callable, b'', 1, True, 'options')
+        self.assertEqual(multi_callable.calls,
+                         [{}, {'protocol_options': 'options'}])
+
+    def test_protocol_options(self):
+        client = Client('localhost', 50051,
+                        compression=Compression(threshold=10))
+        client.load('tests.route_guide.route_guide_pb2')
+        method = client._resolve('GetFeature')
+        method.callable = _MultiCallable()
+        client.request('GetFeature', latitude=409146138,
+                       longitude=(-746188906))
+        client.request('GetFeature')
+        # The options that the stub receives disable the compression of
+        # the message below the threshold.
+        self.assertEqual(
+            [call['protocol_options'].disable_compression
+             for call in method.callable.calls],
+            [False, True]
+        )
+
+    def test_client(self):
+        client = Client('localhost', 50051,
+                        compression=Compression(threshold=0, sample=1))
+        client.load('tests.route_guide.route_guide_pb2')
+        for name in ('GetFeature', 'RecordRoute'):
+            client._resolve(name).callable = _MultiCallable()
+        client.request('GetFeature', latitude=409146138,
+                       longitude=(-746188906))
+        points = [route_guide_pb2.Point(latitude=i) for i in xrange(1, 6)]
+        client.request('RecordRoute', iter(points))
+        snapshot = client.compression.snapshot()
+        self.assertEqual(snapshot['RouteGuide.GetFeature']['enabled_calls'],
+                         1)
+        stats = snapshot['RouteGuide.RecordRoute']
+        # The messages of the request stream are sampled as they are
+        # sent.
+        self.assertEqual((stats['messages'], stats['bytes']),
+                         (5, sum(point.ByteSize() for point in points)))
+
+    def test_cached(self):
+        compression = Compression(threshold=0)
+        client = Client('localhost', 50051, compression=compression,
+                        cache=ResponseCache(['GetFeature']))
+        client.load('tests.route_guide.route_guide_pb2')
+        method = client._resolve('GetFeature').variant(RAW)
+        method.callable = _MultiCallable(b'')
+        for _ in range(2):
+            client.request('GetFeature', latitude=1)
+        # The call served by the response cache is not counted.
+        self.assertEqual(len(method.callable.calls), 1)
+        stats = compression.snapshot()['RouteGuide.GetFeature']
+        self.assertEqual(stats['enabled_calls'], 1)
+
+    def test_random(self):
+        self.assertIsNot(Compression()._random, Compression()._random)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import threading
+import unittest
+
+from pygrpc import Hedger, Retrier, RetryPolicy
+from pygrpc.interceptors import chain
+from tests import FakeFuture, fake_details, unavailable
+
+
+class HedgerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.futures = []
+        self.sent = threading.Semaphore(0)
+        self.future_class = FakeFuture
+        self.now = 0.0
+
+    def details(self, name='GetFeature', future=False):
+        return fake_details(name, future=future)
+
+    def proceed(self, details, request):
+        self.assertTrue(details.future)
+        future = self.future_class()
+        self.futures.append(future)
+        self.sent.release()
+        return future
+
+    def run_hedged(self, hedger, complete):
+        """Issue a hedged request on a thread and call `complete` from
+        the main thread.
+        """
+        result = []
+        thread = threading.Thread(target=lambda: result.append(
+            hedger.intercept(self.details(), 'req', self.proceed)
+        ))
+        thread.start()
+        complete()
+        thread.join()
+        return result[0]
+
+    def test_hedge_wins(self):
+        hedger = Hedger(['GetFeature'], delay=0.01)
+
+        def complete():
+            self.sent.acquire()
+            self.sent.acquire()
+            self.futures[1].set_result('B')
+        self.assertEqual(self.run_hedged(hedger, complete), 'B')
+        # The slow request is cancelled.
+        self.assertTrue(self.futures[0].cancelled())
+        self.assertEqual((hedger.hedges, hedger.wins, hedger.outstanding),
+                         (1, 1, 0))
+
+    def test_first_wins(self):
+        hedger = Hedger(['GetFeature'], delay=10)
+
+        def complete():
+            self.sent.acquire()
+            self.futures[0].set_result('A')
+        self.assertEqual(self.run_hedged(hedger, complete), 'A')
+        self.assertEqual(len(self.futures), 1)
+        self.assertEqual(hedger.hedges, 0)
+
+    def test_cancelled_asynchronously(self):
+        self.future_class = _LateCancel
+        hedger = Hedger(['GetFeature'], delay=0.01)
+
+        def complete():
+            self.sent.acquire()
+            self.sent.acquire()
+            self.futures[0].set_result('A')
+        self.assertEqual(self.run_hedged(hedger, complete), 'A')
+        # The slot of the losing hedge is free before its cancellation
+        # completes.
+        self.assertFalse(self.futures[1].done())
+        self.assertEqual(hedger.outstanding, 0)
+        self.futures[1].set_exception(ValueError('cancelled'))
+        self.assertEqual(hedger.outstanding, 0)
+
+    def test_first_latency(self):
+        hedger = Hedger(['GetFeature'], delay=0.01, min_samples=1,
+                        clock=lambda: self.now)
+
+        def complete():
+            self.sent.acquire()
+            self.now = 1.0
+            self.sent.acquire()
+            self.now = 3.0
+            self.futures[1].set_result('B')
+        self.assertEqual(self.run_hedged(hedger, complete), 'B')
+        # The losing first request ran for 3 seconds, whereas the
+        # winning hedge took 2.
+        latencies = hedger._latencies['RouteGuide.GetFeature']
+        self.assertEqual((latencies.count, latencies.sum), (1, 3.0))
+
+    def test_retrier_before(self):
+        # The hedged requests are futures, which a `Retrier` placed
+        # after the hedger passes through; placed before it, it retries
+        # the hedged request as a whole.
+        def sleep(seconds):
+            pass
+        retrier = Retrier({'GetFeature': RetryPolicy(initial_backoff=0)},
+                          sleep=sleep)
+
+        def proceed(details, request):
+            self.assertTrue(details.future)
+            future = FakeFuture()
+            if not self.futures:
+                future.set_exception(unavailable())
+            else:
+                future.set_result('A')
+            self.futures.append(future)
+            return future
+        hedged = chain([retrier, Hedger(['GetFeature'], delay=10)], proceed)
+        self.assertEqual(hedged(self.details(), 'req'), 'A')
+        self.assertEqual(len(self.futures), 2)
+
+    def test_failure(self):
+        hedger = Hedger(['GetFeature'], delay=0.01)
+
+        def complete():
+            self.sent.acquire()
+            self.sent.acquire()
+            self.futures[1].set_exception(ValueError('B'))
+            self.futures[0].set_result('A')
+        # A failed hedge does not fail the request.
+        self.assertEqual(self.run_hedged(hedger, complete), 'A')
+
+    def test_max_outstanding(self):
+        hedger = Hedger(['GetFeature'], delay=0, max_outstanding=0)
+
+        def complete():
+            self.sent.acquire()
+            self.futures[0].set_result('A')
+        self.assertEqual(self.run_hedged(hedger, complete), 'A')
+        self.assertEqual(len(self.futures), 1)
+
+    def test_observed_delay(self):
+        hedger = Hedger(['GetFeature'], min_samples=2)
+        self.assertEqual(hedger.delay_for('RouteGuide.GetFeature'), None)
+
+        def proceed(details, request):
+            return 'A'
+        for _ in xrange(2):
+            # Without enough samples requests are not hedged.
+            self.assertEqual(hedger.intercept(self.details(), 'req',
+                                              proceed), 'A')
+        self.assertTrue(hedger.delay_for('RouteGuide.GetFeature') > 0)
+
+    def test_passthrough(self):
+        hedger = Hedger(['GetFeature'], delay=0)
+
+        def proceed(details, request):
+            return details
+        details = self.details(future=True)
+        self.assertEqual(hedger.intercept(details, 'req', proceed), details)
+        details = self.details(name='ListFeatures')
+        self.assertEqual(hedger.intercept(details, 'req', proceed), details)
+
+
+class _LateCancel(FakeFuture):
+    """A future whose cancellation completes later, as with gRPC."""
+
+    def cancel(self):
+        return True
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from pygrpc import CallDetails, Interceptor
+from pygrpc.interceptors import chain
+
+
+class _Recording(Interceptor):
+
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def intercept(self, details, request, proceed):
+        self.log.append(self.name)
+        response = proceed(details._replace(timeout=details.timeout + 1),
+                           request)
+        self.log.append(self.name)
+        return response
+
+
+class _ShortCircuit(Interceptor):
+
+    def intercept(self, details, request, proceed):
+        return 'cached'
+
+
+class ChainTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.details = CallDetails('GetFeature', None, 10, False, None, None)
+        self.log = []
+
+    def terminal(self, details, request):
+        self.log.append(('terminal', details.timeout, request))
+        return request * 2
+
+    def test_empty(self):
+        proceed = chain([], self.terminal)
+        self.assertEqual(proceed(self.details, 'A'), 'AA')
+
+    def test_order(self):
+        proceed = chain([_Recording('first', self.log),
+                         _Recording('second', self.log)], self.terminal)
+        self.assertEqual(proceed(self.details, 'A'), 'AA')
+        # Each interceptor sees the details replaced by the previous one.
+        self.assertEqual(self.log, ['first', 'second', ('terminal', 12, 'A'),
+                                    'second', 'first'])
+
+    def test_short_circuit(self):
+        proceed = chain([_ShortCircuit(), _Recording('second', self.log)],
+                        self.terminal)
+        self.assertEqual(proceed(self.details, 'A'), 'cached')
+        self.assertEqual(self.log, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
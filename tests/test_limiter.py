@@ -0,0 +1,152 @@
+import threading
+import unittest
+
+from grpc.beta.interfaces import StatusCode
+from grpc.framework.common.cardinality import Cardinality
+from pygrpc import (AIMDLimit, ConcurrencyLimiter, GradientLimit,
+                    LimitExceededError)
+from tests import FakeFuture, fake_details, unavailable
+
+
+class AIMDLimitTestCase(unittest.TestCase):
+
+    def test_update(self):
+        limit = AIMDLimit(initial=10, backoff=0.5, latency=1)
+        # An unused limit does not grow.
+        self.assertEqual(limit.update(0.1, 2, False), 10)
+        self.assertEqual(limit.update(0.1, 5, False), 11)
+        self.assertEqual(limit.update(0.1, 5, True), 5.5)
+        # A call slower than `latency` counts as dropped.
+        self.assertEqual(limit.update(2, 5, False), 2.75)
+        limit.limit = 1
+        self.assertEqual(limit.update(0.1, 1, True), 1)
+
+
+class GradientLimitTestCase(unittest.TestCase):
+
+    def test_update(self):
+        limit = GradientLimit(initial=16, smoothing=1, tolerance=1)
+        for _ in xrange(10):
+            limit.update(0.01, 16, False)
+        grown = limit.limit
+        self.assertTrue(grown > 16)
+        # Inflated latencies shrink the limit.
+        for _ in xrange(10):
+            limit.update(0.1, int(limit.limit), False)
+        self.assertTrue(limit.limit < grown)
+
+
+class ConcurrencyLimiterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.limiter = ConcurrencyLimiter(AIMDLimit(initial=2, backoff=0.5),
+                                          clock=lambda: self.now)
+
+    def test_reject(self):
+        self.limiter.block = False
+        futures = [FakeFuture(), FakeFuture()]
+        proceed = iter(futures).next
+        for _ in futures:
+            self.limiter.intercept(fake_details(future=True), 'req',
+                                   lambda details, request: proceed())
+        self.assertEqual(self.limiter.inflight, 2)
+        with self.assertRaises(LimitExceededError) as context:
+            self.limiter.intercept(fake_details(future=True), 'req', None)
+        self.assertEqual(context.exception.code,
+                         StatusCode.RESOURCE_EXHAUSTED)
+        self.assertEqual(self.limiter.rejected, 1)
+        futures[0].set_result('A')
+        # The successful call used the limit, therefore, it grows.
+        self.assertEqual((self.limiter.inflight, self.limiter.limit), (1, 3))
+        futures[1].set_exception(unavailable())
+        self.assertEqual((self.limiter.inflight, self.limiter.limit), (0, 1))
+
+    def test_queue(self):
+        future = FakeFuture()
+        self.limiter.intercept(fake_details(future=True), 'req',
+                               lambda details, request: future)
+        self.limiter.intercept(fake_details(future=True), 'req',
+                               lambda details, request: FakeFuture())
+        results = []
+
+        def call():
+            results.append(self.limiter.intercept(
+                fake_details(timeout=10), 'req',
+                lambda details, request: details.timeout
+            ))
+        waiter = threading.Thread(target=call)
+        waiter.start()
+        while not self.limiter.queued:
+            pass
+        self.assertEqual(results, [])
+        self.now += 3
+        future.set_result('A')
+        waiter.join()
+        # The call waited 3 seconds of its timeout in the queue.
+        self.assertEqual((results, self.limiter.queued), ([7], 0))
+
+    def test_queue_timeout(self):
+        self.limiter.max_queue = 0
+        for _ in xrange(2):
+            self.limiter.intercept(fake_details(future=True), 'req',
+                                   lambda details, request: FakeFuture())
+        with self.assertRaises(LimitExceededError):
+            self.limiter.intercept(fake_details(), 'req', None)
+        self.limiter.max_queue = None
+        # A call waits no longer than its timeout.
+        with self.assertRaises(LimitExceededError):
+            self.limiter.intercept(fake_details(timeout=0), 'req', None)
+        self.assertEqual(self.limiter.rejected, 2)
+
+    def test_stream(self):
+        responses = iter(['A', 'B'])
+        released = self.limiter.intercept(
+            fake_details(cardinality=Cardinality.UNARY_STREAM), 'req',
+            lambda details, request: responses
+        )
+        self.assertEqual(self.limiter.inflight, 1)
+        self.assertEqual(list(released), ['A', 'B'])
+        self.assertEqual(self.limiter.inflight, 0)
+        # The duration of a stream does not change the limit.
+        self.assertEqual(self.limiter.limit, 2)
+
+    def test_abandoned_stream(self):
+        details = fake_details(cardinality=Cardinality.UNARY_STREAM)
+        responses = self.limiter.intercept(
+            details, 'req', lambda details, request: iter(['A', 'B'])
+        )
+        for _ in responses:
+            break
+        self.assertEqual(self.limiter.inflight, 1)
+        # The slot is released when the stream is garbage collected.
+        del responses
+        self.assertEqual(self.limiter.inflight, 0)
+        stream = _Stream(['A', 'B'])
+        responses = self.limiter.intercept(
+            details, 'req', lambda details, request: stream
+        )
+        next(responses)
+        responses.close()
+        self.assertEqual((self.limiter.inflight, stream.cancelled), (0, True))
+
+
+class _Stream(object):
+    """A response stream that can be cancelled."""
+
+    def __init__(self, responses):
+        self._responses = iter(responses)
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        return next(self._responses)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from pygrpc import Metrics, Recorder
+from pygrpc.metrics import BUCKETS, RECEIVED, SENT, Histogram, observe
+from tests import FakeMethod
+
+
+class _Listener(Recorder):
+
+    def __init__(self):
+        self.calls = []
+
+    def record_call(self, method, overhead, wire, exception):
+        self.calls.append((method, exception))
+
+
+class HistogramTestCase(unittest.TestCase):
+
+    def test_quantile(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.quantile(0.5))
+        for _ in xrange(99):
+            histogram.add(BUCKETS[0])
+        histogram.add(BUCKETS[10])
+        self.assertEqual(histogram.quantile(0.5), BUCKETS[0])
+        self.assertEqual(histogram.quantile(1.0), BUCKETS[10])
+        self.assertEqual(histogram.count, 100)
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.listener = _Listener()
+        self.metrics = Metrics(listeners=[self.listener])
+
+    def test_snapshot(self):
+        self.metrics.record_call('GetFeature', 1e-5, 1e-3, None)
+        self.metrics.record_call('GetFeature', 1e-5, 1e-3, KeyError())
+        self.metrics.record_message('GetFeature', SENT, 10)
+        self.metrics.record_message('GetFeature', RECEIVED, 20)
+        snapshot = self.metrics.snapshot()['GetFeature']
+        self.assertEqual(snapshot['calls'], 2)
+        self.assertEqual(snapshot['errors'], {'KeyError': 1})
+        self.assertEqual(snapshot['wire']['count'], 2)
+        self.assertEqual((snapshot['bytes_sent'], snapshot['bytes_received']),
+                         (10, 20))
+        # The listener receives every measurement.
+        self.assertEqual(len(self.listener.calls), 2)
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(), {})
+
+    def test_observe(self):
+        def dispatch(method, request, timeout, future):
+            return b'reply'
+        for service in ('Greeter', 'Copy'):
+            observe(self.metrics, FakeMethod('SayHello', service=service),
+                    self.metrics.clock(), dispatch, b'name', 1, False)
+        # The methods of the services that share a method name are kept
+        # apart.
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(sorted(snapshot), ['Copy.SayHello',
+                                            'Greeter.SayHello'])
+        self.assertEqual(snapshot['Copy.SayHello']['bytes_received'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from grpc.framework.interfaces.face import face
+from pygrpc import (CircuitBreaker, CircuitOpenError, HealthCheck,
+                    PooledClient, PowerOfTwoChoices, RoundRobin,
+                    read_addresses, rpc_probe)
+from pygrpc.pool import Endpoint, _TrackedIterator
+from tests.helloworld import helloworld_pb2
+
+
+class _Greeter(helloworld_pb2.BetaGreeterServicer):
+
+    def __init__(self, name):
+        self.name = name
+
+    def SayHello(self, request, context):
+        return helloworld_pb2.HelloReply(message=self.name)
+
+
+class _Server(object):
+    """A local in-process Greeter server that answers with its name."""
+
+    def __init__(self, name):
+        self.name = name
+        self._server = helloworld_pb2.beta_create_Greeter_server(
+            _Greeter(name)
+        )
+        self.port = self._server.add_insecure_port('[::]:0')
+        self._server.start()
+
+    @property
+    def address(self):
+        return ('localhost', self.port)
+
+    def stop(self):
+        self._server.stop(0)
+
+
+class BalancingTestCase(unittest.TestCase):
+    _SERVERS = 3
+    _REQUESTS = 60
+
+    def setUp(self):
+        self.servers = [_Server(str(i)) for i in xrange(self._SERVERS)]
+        self.addresses = [server.address for server in self.servers]
+        self.clients = []
+
+    def create_client(self, **kwargs):
+        client = PooledClient(lambda: self.addresses,
+                              policy=PowerOfTwoChoices(),
+                              health_check=HealthCheck(
+                                  rpc_probe('SayHello', name='health'),
+                                  interval=3600, fall=1
+                              ), **kwargs)
+        client.load('tests.helloworld.helloworld_pb2')
+        self.clients.append(client)
+        return client
+
+    def replies(self, client):
+        counts = {}
+        for _ in xrange(self._REQUESTS):
+            name = client.request('SayHello', name='you').message
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def test_spread(self):
+        client = self.create_client()
+        self.assertEqual(sorted(self.replies(client)),
+                         [server.name for server in self.servers])
+
+    def test_unhealthy(self):
+        client = self.create_client()
+        self.servers[0].stop()
+        client.check_health()
+        self.assertEqual([e.healthy for e in client.endpoints],
+                         [False, True, True])
+        self.assertEqual(sorted(self.replies(client)), ['1', '2'])
+
+    def test_refresh(self):
+        client = self.create_client()
+        self.addresses = self.addresses[1:]
+        client.refresh()
+        self.assertEqual(len(client.endpoints), self._SERVERS - 1)
+        self.assertEqual(sorted(self.replies(client)), ['1', '2'])
+        self.addresses = [server.address for server in self.servers]
+        client.refresh()
+        # The new endpoint loads the modules loaded before.
+        self.assertEqual(sorted(self.replies(client)), ['0', '1', '2'])
+
+    def test_load_while_refreshing(self):
+        addresses = self.addresses
+        self.addresses = addresses[:1]
+        client = PooledClient(lambda: self.addresses, policy=RoundRobin())
+        self.clients.append(client)
+        self.addresses = addresses
+        load = client._index.load
+        refreshing = threading.Thread(target=client.refresh)
+        replies = []
+
+        def load_and_request(*args, **kwargs):
+            # Refresh while the module is being loaded.
+            refreshing.start()
+            refreshing.join(0.1)
+            keys = load(*args, **kwargs)
+            # Once the client resolves the RPC method, every channel
+            # can issue it.
+            for _ in client.endpoints:
+                replies.append(
+                    client.request('SayHello', name='you').message
+                )
+            return keys
+        client._index.load = load_and_request
+        client.load('tests.helloworld.helloworld_pb2')
+        refreshing.join()
+        # The refresh waited for the module to be loaded.
+        self.assertEqual(replies, ['0'])
+        self.assertEqual(len(client.endpoints), self._SERVERS)
+        self.assertEqual(sorted(self.replies(client)), ['0', '1', '2'])
+
+    def test_not_loaded(self):
+        client = PooledClient(self.addresses, policy=RoundRobin())
+        self.clients.append(client)
+        client.load('tests.helloworld.helloworld_pb2')
+        client.endpoints[1].index.unload('tests.helloworld.helloworld_pb2')
+        client.request('SayHello', name='you')
+        with self.assertRaises(AttributeError) as context:
+            client.request('SayHello', name='you')
+        self.assertIn('Greeter.SayHello', str(context.exception))
+
+    def test_breaker(self):
+        breaker = CircuitBreaker(window=2, min_calls=2, open_seconds=3600)
+        client = PooledClient(self.addresses, policy=RoundRobin(),
+                              breaker=breaker)
+        client.load('tests.helloworld.helloworld_pb2')
+        self.servers[0].stop()
+        failures = 0
+        for _ in xrange(self._REQUESTS):
+            try:
+                client.request('SayHello', name='you')
+            except face.AbortionError:
+                failures += 1
+        # The failing endpoint is ejected once its circuit opens.
+        self.assertEqual(failures, 2)
+        self.assertEqual(breaker.state(client.endpoints[0]), 'open')
+        for server in self.servers[1:]:
+            server.stop()
+        for _ in xrange(4):
+            try:
+                client.request('SayHello', name='you')
+            except face.AbortionError:
+                pass
+        with self.assertRaises(CircuitOpenError):
+            client.request('SayHello', name='you')
+
+    def test_read_addresses(self):
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write('# backends\nlocalhost:{}\n\nlocalhost:{}  # b\n'
+                        .format(self.servers[0].port, self.servers[1].port))
+            self.assertEqual(read_addresses(path), self.addresses[:2])
+            client = PooledClient(path)
+            self.assertEqual(len(client.endpoints), 2)
+        finally:
+            os.remove(path)
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        for server in self.servers:
+            server.stop()
+
+
+class _Stream(object):
+    """A response stream that can be cancelled."""
+
+    def __init__(self, responses):
+        self._responses = iter(responses)
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        return next(self._responses)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TrackedIteratorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.endpoint = Endpoint('localhost', 0, None)
+        self.endpoint.acquire()
+
+    def test_abandoned(self):
+        responses = _TrackedIterator(iter(['A', 'B']), self.endpoint)
+        for _ in responses:
+            break
+        self.assertEqual(self.endpoint.outstanding, 1)
+        # The endpoint is released when the stream is garbage collected.
+        del responses
+        self.assertEqual(self.endpoint.outstanding, 0)
+
+    def test_close(self):
+        stream = _Stream(['A', 'B'])
+        responses = _TrackedIterator(stream, self.endpoint)
+        next(responses)
+        responses.close()
+        responses.close()
+        self.assertEqual((self.endpoint.outstanding, stream.cancelled),
+                         (0, True))
+
+
+class PowerOfTwoChoicesTestCase(unittest.TestCase):
+
+    def test_random(self):
+        # Every policy has its own random number generator.
+        self.assertIsNot(PowerOfTwoChoices()._random,
+                         PowerOfTwoChoices()._random)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import unittest
+
+from grpc.beta.interfaces import StatusCode
+from grpc.framework.common.cardinality import Cardinality
+from grpc.framework.interfaces.face import face
+from pygrpc import CircuitOpenError, Retrier, RetryBudget, RetryPolicy
+from tests import fake_details, unavailable
+
+
+class RetrierTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.sleeps = []
+        self.attempts = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+    def retrier(self, budget=None, **kwargs):
+        policy = RetryPolicy(initial_backoff=1, **kwargs)
+        return Retrier({'GetFeature': policy}, budget=budget,
+                       sleep=self.sleep, clock=self.clock,
+                       random=lambda: 0.5)
+
+    def details(self, cardinality=Cardinality.UNARY_UNARY, timeout=10,
+                name='GetFeature'):
+        return fake_details(name, cardinality, timeout, started=0.0)
+
+    def failing(self, failures, response='A'):
+        def proceed(details, request):
+            self.attempts.append(details.timeout)
+            if len(self.attempts) <= failures:
+                raise unavailable()
+            return response
+        return proceed
+
+    def test_retry(self):
+        response = self.retrier().intercept(self.details(), 'req',
+                                            self.failing(2))
+        self.assertEqual(response, 'A')
+        # Full jitter halves the exponential bounds of 1 and 2 seconds,
+        # and every attempt gets the remaining timeout.
+        self.assertEqual(self.sleeps, [0.5, 1.0])
+        self.assertEqual(self.attempts, [10, 9.5, 8.5])
+
+    def test_max_attempts(self):
+        with self.assertRaises(face.NetworkError):
+            self.retrier().intercept(self.details(), 'req', self.failing(3))
+        self.assertEqual(len(self.attempts), 3)
+
+    def test_not_retryable(self):
+        def proceed(details, request):
+            self.attempts.append(details)
+            raise face.RemoteError(None, None, StatusCode.INVALID_ARGUMENT,
+                                   '')
+        with self.assertRaises(face.RemoteError):
+            self.retrier().intercept(self.details(), 'req', proceed)
+        self.assertEqual(len(self.attempts), 1)
+
+    def test_local_rejection(self):
+        def proceed(details, request):
+            self.attempts.append(details)
+            raise CircuitOpenError('Circuit of GetFeature is open.')
+        # The rejection has a retryable status code, but retrying it
+        # would not reach the server.
+        with self.assertRaises(CircuitOpenError):
+            self.retrier().intercept(self.details(), 'req', proceed)
+        self.assertEqual((len(self.attempts), self.sleeps), (1, []))
+
+    def test_unknown_method(self):
+        with self.assertRaises(face.NetworkError):
+            self.retrier().intercept(self.details(name='ListFeatures'),
+                                     'req', self.failing(1))
+        self.assertEqual(len(self.attempts), 1)
+
+    def test_qualified_name(self):
+        retrier = Retrier({'Copy.GetFeature': RetryPolicy(initial_backoff=1)},
+                          sleep=self.sleep, clock=self.clock)
+        # The policy of another service with the same method name does
+        # not apply.
+        with self.assertRaises(face.NetworkError):
+            retrier.intercept(self.details(), 'req', self.failing(1))
+        self.assertEqual(len(self.attempts), 1)
+
+    def test_deadline(self):
+        # The first retry would wait past the deadline.
+        with self.assertRaises(face.NetworkError):
+            self.retrier().intercept(self.details(timeout=0.5), 'req',
+                                     self.failing(1))
+        self.assertEqual(self.sleeps, [])
+
+    def test_attempt_timeout(self):
+        self.retrier(attempt_timeout=2).intercept(self.details(), 'req',
+                                                  self.failing(1))
+        self.assertEqual(self.attempts, [2, 2])
+
+    def test_budget(self):
+        budget = RetryBudget(ratio=0.5, max_tokens=1)
+        retrier = self.retrier(budget=budget, max_attempts=5)
+        with self.assertRaises(face.NetworkError):
+            retrier.intercept(self.details(), 'req', self.failing(5))
+        # The bucket held a single token.
+        self.assertEqual(len(self.attempts), 2)
+        self.assertEqual((budget.retries, budget.exhausted), (1, 1))
+        self.attempts = []
+        # Two more requests deposit another token.
+        retrier.intercept(self.details(), 'req', self.failing(0))
+        self.attempts = []
+        self.assertEqual(retrier.intercept(self.details(), 'req',
+                                           self.failing(1)), 'A')
+        self.assertEqual(budget.retries, 2)
+
+    def test_request_stream(self):
+        def proceed(details, request):
+            self.attempts.append(details)
+            if len(self.attempts) == 1:
+                raise unavailable()
+            next(request)
+            raise unavailable()
+        details = self.details(Cardinality.STREAM_UNARY)
+        with self.assertRaises(face.NetworkError):
+            self.retrier().intercept(details, iter('ab'), proceed)
+        # The request stream was consumed by the second attempt.
+        self.assertEqual(len(self.attempts), 2)
+
+    def test_response_stream(self):
+        def stream(fail):
+            if fail:
+                raise unavailable()
+            yield 'A'
+            raise unavailable()
+
+        def proceed(details, request):
+            self.attempts.append(details)
+            return stream(len(self.attempts) == 1)
+        responses = self.retrier().intercept(
+            self.details(Cardinality.UNARY_STREAM), 'req', proceed
+        )
+        self.assertEqual(next(responses), 'A')
+        # A failure after the first response message is not retried.
+        with self.assertRaises(face.NetworkError):
+            next(responses)
+        self.assertEqual(len(self.attempts), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import gc
+import threading
+import unittest
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from pygrpc import RequestQueue, batches
+
+
+class RequestQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = RequestQueue(maxsize=2)
+
+    def test_close(self):
+        self.queue.put('A')
+        self.queue.put('B')
+        self.queue.close()
+        self.assertEqual(list(self.queue), ['A', 'B'])
+        with self.assertRaises(ValueError):
+            self.queue.put('C')
+
+    def test_offer(self):
+        self.assertTrue(self.queue.offer('A'))
+        self.assertTrue(self.queue.offer('B'))
+        self.assertFalse(self.queue.offer('C'))
+        self.assertEqual(self.queue.depth, 2)
+
+    def test_put_timeout(self):
+        self.queue.put('A')
+        self.queue.put('B')
+        with self.assertRaises(queue.Full):
+            self.queue.put('C', timeout=0)
+        self.assertEqual(self.queue.blocked, 1)
+
+    def test_bounded(self):
+        count = 100
+
+        def produce():
+            for i in xrange(count):
+                self.queue.put(i)
+            self.queue.close()
+        producer = threading.Thread(target=produce)
+        producer.start()
+        self.assertEqual(list(self.queue), range(count))
+        producer.join()
+        self.assertTrue(self.queue.high_water <= self.queue.maxsize)
+        self.assertEqual(self.queue.consumed, count)
+
+    def test_abort(self):
+        self.queue.put('A')
+        self.queue.abort(KeyError('B'))
+        with self.assertRaises(KeyError):
+            next(self.queue)
+        self.assertEqual(self.queue.depth, 0)
+
+    def test_abort_wakes_producer(self):
+        self.queue.put('A')
+        self.queue.put('B')
+        errors = []
+
+        def produce():
+            try:
+                self.queue.put('C')
+            except ValueError as exception:
+                errors.append(exception)
+        producer = threading.Thread(target=produce)
+        producer.start()
+        self.queue.abort()
+        producer.join()
+        self.assertEqual(len(errors), 1)
+
+
+class BatchesTestCase(unittest.TestCase):
+
+    def test_batches(self):
+        self.assertEqual(list(batches(xrange(7), size=3)),
+                         [[0, 1, 2], [3, 4, 5], [6]])
+
+    def test_prefetch(self):
+        self.assertEqual(list(batches(xrange(7), size=3, prefetch=2)),
+                         [[0, 1, 2], [3, 4, 5], [6]])
+
+    def test_interval(self):
+        arrived = threading.Event()
+        release = threading.Event()
+
+        def responses():
+            yield 0
+            arrived.set()
+            release.wait()
+            yield 1
+
+        iterator = batches(responses(), size=3, interval=0.01)
+        arrived.wait()
+        # A partial list is returned once the interval elapses.
+        self.assertEqual(next(iterator), [0])
+        release.set()
+        self.assertEqual(list(iterator), [[1]])
+
+    def test_exception(self):
+        def responses():
+            yield 0
+            raise KeyError('A')
+
+        iterator = batches(responses(), size=3, prefetch=1)
+        self.assertEqual(next(iterator), [0])
+        with self.assertRaises(KeyError):
+            next(iterator)
+
+    def test_cancel(self):
+        cancelled = []
+
+        class Responses(object):
+            def __iter__(self):
+                return iter(xrange(100))
+
+            def cancel(self):
+                cancelled.append(True)
+
+        iterator = batches(Responses(), size=3, prefetch=1)
+        self.assertEqual(next(iterator), [0, 1, 2])
+        iterator.cancel()
+        self.assertEqual(cancelled, [True])
+
+    def test_abandoned(self):
+        cancelled = []
+
+        class Responses(object):
+            def __iter__(self):
+                return iter(xrange(100))
+
+            def cancel(self):
+                cancelled.append(True)
+
+        iterator = batches(Responses(), size=3, prefetch=1)
+        self.assertEqual(next(iterator), [0, 1, 2])
+        prefetcher = iterator._prefetcher
+        # The reading thread waits for room in the buffer until the
+        # iterator is garbage collected.
+        del iterator
+        gc.collect()
+        with prefetcher.condition:
+            while not prefetcher.done:
+                prefetcher.condition.wait(1)
+        self.assertEqual(cancelled, [True])
+        # An iterator over a stream that ended does not cancel it.
+        iterator = batches(Responses(), size=100, prefetch=1)
+        self.assertEqual(len(list(iterator)), 1)
+        iterator.close()
+        self.assertEqual(cancelled, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()